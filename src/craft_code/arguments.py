@@ -0,0 +1,344 @@
+"""Tolerant parsing and validation of tool-call arguments.
+
+Small local models often emit almost-JSON: trailing commas, single quotes,
+raw newlines in strings, regex backslashes such as ``\\d``, Python literals or
+an object cut off by the token limit. Rather than failing the turn, the
+arguments are repaired and then validated (and coerced) against the tool's
+JSON schema. When that is not possible the model gets a compact error
+describing what was expected, so it can retry within the same turn.
+
+Completing truncated input is only safe for read-only tools: a ``write_file``
+call cut off by the token limit would write a truncated file. Callers pass
+``allow_truncated=False`` for mutating tools and for responses that stopped
+at the length limit, and such calls get an error instead.
+
+`strict_schema` rewrites a tool schema for servers that support constrained
+decoding (OpenAI ``strict`` function calling, llama.cpp / LM Studio grammars
+derived from the schema).
+"""
+import json
+import re
+
+_FENCE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+_DANGLING_KEY = re.compile(r'(?<=[{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$')
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_JSON_ESCAPES = set('"\\/bfnrtu')
+
+
+class TruncatedArguments(ValueError):
+    """Raised when arguments only parse after completing truncated input."""
+
+
+def _strip_trailing_comma(out):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def repair_json(text):
+    """Rewrite almost-JSON into valid JSON text.
+
+    See `_repair`; this only returns the text.
+    """
+    return _repair(text)[0]
+
+
+def _repair(text):
+    """Rewrite almost-JSON into valid JSON text.
+
+    Handles code fences, single-quoted strings, unescaped control characters
+    and invalid escapes inside strings, Python literals, trailing commas and
+    truncated input (unterminated strings, dangling keys, unclosed brackets).
+
+    Args:
+        text (str): Raw arguments emitted by the model.
+
+    Returns:
+        tuple: ``(text, truncated)``: the repaired text (not guaranteed to
+        parse), and whether unterminated input had to be completed.
+    """
+    fenced = _FENCE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("{")
+    if start > 0:
+        text = text[start:]
+
+    out = []
+    stack = []
+    quote = None
+    escape = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if escape:
+                escape = False
+                if ch == "'":
+                    out[-1] = "'"  # \' is not a JSON escape
+                elif ch not in _JSON_ESCAPES:
+                    out.append("\\")  # keep a literal backslash (e.g. regex \d)
+                    out.append(ch)
+                else:
+                    out.append(ch)
+            elif ch == "\\":
+                out.append(ch)
+                escape = True
+            elif ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"':
+                out.append('\\"')
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            else:
+                out.append(ch)
+        elif ch in "\"'":
+            out.append('"')
+            quote = ch
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]":
+            _strip_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(ch)
+        else:
+            word = next((w for w in _PYTHON_LITERALS if text.startswith(w, i)), None)
+            before = text[i - 1] if i else " "
+            after = text[i + len(word)] if word and i + len(word) < len(text) else " "
+            if word and not (before.isalnum() or before == "_") and not (after.isalnum() or after == "_"):
+                out.append(_PYTHON_LITERALS[word])
+                i += len(word)
+                continue
+            out.append(ch)
+        i += 1
+
+    # Truncated input: close the open string, drop a dangling key, close brackets
+    truncated = bool(quote or stack)
+    if quote:
+        if escape:
+            out.pop()
+        out.append('"')
+    repaired = "".join(out).rstrip()
+    if stack and stack[-1] == "}":
+        repaired = _DANGLING_KEY.sub("", repaired)
+    out = list(repaired)
+    while stack:
+        _strip_trailing_comma(out)
+        out.append(stack.pop())
+    return "".join(out), truncated
+
+
+def loads(text, allow_truncated=True):
+    """Parse tool arguments, repairing them if needed.
+
+    Args:
+        text (str | dict | None): Raw arguments.
+        allow_truncated (bool): Accept repairs that complete truncated input.
+
+    Returns:
+        tuple: ``(value, repaired)``.
+
+    Raises:
+        TruncatedArguments: If the input is truncated and ``allow_truncated`` is False.
+        ValueError: If the arguments cannot be parsed even after repair.
+    """
+    if isinstance(text, dict):
+        return text, False
+    if text is None or not str(text).strip():
+        return {}, False
+    try:
+        value, repaired = json.loads(text), False
+    except ValueError:
+        fixed, truncated = _repair(text)
+        if truncated and not allow_truncated:
+            raise TruncatedArguments("arguments are truncated")
+        value, repaired = json.loads(fixed), True
+    if isinstance(value, str):
+        # Double-encoded arguments: a JSON string holding the object
+        value, _ = loads(value, allow_truncated)
+        repaired = True
+    return value, repaired
+
+
+def _coerce(value, schema):
+    """Return ``value`` converted to the schema's type.
+
+    Raises:
+        ValueError: If the value cannot be converted.
+    """
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        if value is None and "null" in kind:
+            return None
+        kind = next((k for k in kind if k != "null"), None)
+
+    if kind == "string":
+        if isinstance(value, str):
+            return value
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value)
+    elif kind == "integer":
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str) and re.fullmatch(r"\s*-?\d+\s*", value):
+            return int(value)
+    elif kind == "number":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    elif kind == "boolean":
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, (str, int)) and str(value).strip().lower() in {"true", "1", "yes", "false", "0", "no"}:
+            return str(value).strip().lower() in {"true", "1", "yes"}
+    elif kind == "array":
+        if isinstance(value, str) and value.strip().startswith("["):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        if not isinstance(value, list):
+            value = [value]
+        return [_coerce(item, schema.get("items", {})) for item in value]
+    elif kind == "object":
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        if isinstance(value, dict):
+            return value
+    else:
+        return value
+    raise ValueError(f"expected {kind}, got {type(value).__name__}")
+
+
+def validate(args, schema):
+    """Check and coerce arguments against a JSON schema of parameters.
+
+    Unknown arguments are dropped, and so are ``null`` optional arguments
+    (their default applies).
+
+    Args:
+        args (dict): Parsed arguments.
+        schema (dict): ``parameters`` schema of the tool.
+
+    Returns:
+        tuple: ``(args, problems)`` with the coerced arguments and a dict of
+        argument name to problem.
+    """
+    properties = schema.get("properties", {})
+    required = set(schema.get("required", []))
+    coerced = {}
+    problems = {}
+    for name, value in args.items():
+        if name not in properties:
+            continue
+        if value is None and name not in required:
+            continue
+        try:
+            coerced[name] = _coerce(value, properties[name])
+        except ValueError as e:
+            problems[name] = str(e)
+    for name in required:
+        if name not in args or args[name] is None:
+            problems[name] = "missing required argument"
+    return coerced, problems
+
+
+def _expected(schema):
+    required = set(schema.get("required", []))
+    expected = {}
+    for name, prop in schema.get("properties", {}).items():
+        kind = prop.get("type", "any")
+        if isinstance(kind, list):
+            kind = "|".join(k for k in kind if k != "null")
+        expected[name] = f"{kind}{' (required)' if name in required else ''}"
+    return expected
+
+
+def parse_arguments(tool_name, raw, schema=None, allow_truncated=True):
+    """Parse, repair and validate the arguments of a tool call.
+
+    Args:
+        tool_name (str): Name of the called tool.
+        raw (str): Arguments as emitted by the model.
+        schema (dict, optional): ``parameters`` schema; validation is skipped without it.
+        allow_truncated (bool): Accept arguments that only parse once
+            truncated input is completed (safe for read-only tools only).
+
+    Returns:
+        tuple: ``(args, error)``. ``error`` is None on success, otherwise a
+        compact dict to send back to the model as the tool result.
+    """
+    try:
+        args, _ = loads(raw, allow_truncated)
+    except TruncatedArguments:
+        detail = "arguments are truncated (the output was probably cut off)"
+        args = None
+    except ValueError:
+        detail = "arguments are not valid JSON"
+        args = None
+    else:
+        detail = None if isinstance(args, dict) else "arguments must be a JSON object"
+
+    if detail is None and schema is not None:
+        args, problems = validate(args, schema)
+        if problems:
+            detail = "; ".join(f"{name}: {problem}" for name, problem in problems.items())
+
+    if detail is None:
+        return args, None
+    error = {"error": f"Invalid arguments for '{tool_name}': {detail}. Fix the arguments and call the tool again."}
+    if schema is not None:
+        error["expected"] = _expected(schema)
+    return None, error
+
+
+def strict_schema(tool_schema):
+    """Return a tool schema suited to constrained (strict) decoding.
+
+    All properties become required, optional ones nullable, and additional
+    properties are forbidden, which is what OpenAI ``strict`` mode expects and
+    what grammar-based servers compile most reliably. `validate` drops the
+    ``null`` optional arguments again, so defaults still apply.
+
+    Args:
+        tool_schema (dict): OpenAI function-calling schema.
+    """
+    function = tool_schema["function"]
+    parameters = function.get("parameters", {})
+    required = set(parameters.get("required", []))
+    properties = {}
+    for name, prop in parameters.get("properties", {}).items():
+        prop = dict(prop)
+        if name not in required and isinstance(prop.get("type"), str):
+            prop["type"] = [prop["type"], "null"]
+        properties[name] = prop
+    return {
+        "type": "function",
+        "function": {
+            **function,
+            "strict": True,
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+                "additionalProperties": False,
+            },
+        },
+    }
@@ -0,0 +1,180 @@
+"""Headless batch runner for many questions over many workspaces.
+
+Jobs are read from a JSONL file, one object per line::
+
+    {"id": "audit-api", "question": "List all TODOs", "workspace": "../api"}
+
+``id`` defaults to the line number and ``workspace`` to the current
+directory. Jobs run concurrently over one shared client and each result is
+appended to the output JSONL as soon as its job finishes, so an interrupted
+batch resumes by skipping the jobs already recorded as successful. On Ctrl+C
+queued jobs are dropped, running ones are cancelled, and whatever they
+return is still recorded (as ``cancelled``, so a rerun picks them up again).
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from craft_code.core import run_agent
+from craft_code.session import Session
+from craft_code.config.prompts import build_system_prompt
+
+
+def load_jobs(path):
+    """Read jobs from a JSONL file.
+
+    Args:
+        path (str): Input JSONL path.
+
+    Returns:
+        list[dict]: Jobs with ``id``, ``question`` and ``workspace`` set.
+
+    Raises:
+        ValueError: If a line is not valid JSON or has no question.
+    """
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: invalid JSON ({e})")
+            if not isinstance(job, dict) or not job.get("question"):
+                raise ValueError(f"{path}:{number}: missing 'question'")
+            jobs.append({
+                "id": str(job.get("id", f"line-{number}")),
+                "question": job["question"],
+                "workspace": job.get("workspace", "."),
+            })
+    return jobs
+
+
+def completed_ids(path):
+    """Return the ids of jobs already recorded as successful in an output file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A partially written last line from an interrupted run
+                continue
+            if record.get("status") == "ok":
+                done.add(record.get("id"))
+    return done
+
+
+def run_job(job, client, config=None, parent=None):
+    """Run a single job in its own session and return its result record.
+
+    Args:
+        job (dict): Job from `load_jobs`.
+        client: Chat client.
+        config (dict, optional): Configuration of the job session.
+        parent (Session, optional): Cancelling it cancels the job.
+    """
+    trace = []
+    answer = None
+    start = time.perf_counter()
+
+    def callback(message):
+        if message.get("role") == "tool":
+            trace.append({
+                "tool": message["tool_name"],
+                "arguments": message.get("arguments"),
+                "output_chars": len(message.get("content", "")),
+                "elapsed": round(time.perf_counter() - start, 3),
+            })
+
+    record = {"id": job["id"], "question": job["question"], "workspace": job["workspace"]}
+    try:
+        if not os.path.isdir(job["workspace"]):
+            raise ValueError(f"Workspace not found: {job['workspace']}")
+        session = Session(job["workspace"], config=config, parent=parent)
+        try:
+            messages = [
+                {"role": "system", "content": build_system_prompt(session)},
+                {"role": "user", "content": job["question"]},
+            ]
+            messages = run_agent(messages=messages, client=client, callback=callback, session=session)
+            record["prompt_tokens_saved"] = session.turn_stats.get("prompt_tokens_saved", 0)
+            record["cache_invalidations"] = session.turn_stats.get("cache_invalidations", 0)
+        finally:
+            session.close()
+        last = messages[-1]
+        if isinstance(last, dict) and last.get("role") == "assistant":
+            answer = last.get("content")
+        record["status"] = "cancelled" if session.cancelled else "ok"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+
+    record["answer"] = answer
+    record["tool_trace"] = trace
+    record["elapsed"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run_batch(jobs, client, output_path, concurrency=4, on_result=None, config=None):
+    """Run jobs concurrently, streaming results to ``output_path``.
+
+    Jobs whose id is already recorded as successful in ``output_path`` are
+    skipped. On KeyboardInterrupt, queued jobs are cancelled, running jobs
+    are asked to stop, their records are written, and the interrupt is
+    re-raised.
+
+    Args:
+        jobs (list[dict]): Jobs from `load_jobs`.
+        client: Chat client shared by all jobs.
+        output_path (str): JSONL file results are appended to.
+        concurrency (int): Maximum number of jobs running at once.
+        on_result (Callable, optional): Called with each result record.
+        config (dict, optional): Configuration shared by all job sessions.
+
+    Returns:
+        list[dict]: Result records of the jobs run in this invocation.
+    """
+    done = completed_ids(output_path)
+    pending = [job for job in jobs if job["id"] not in done]
+    results = []
+    # Parent of all job sessions: cancelling it stops every running job
+    batch_session = Session(os.getcwd(), config=config)
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="craft-batch") as executor:
+        if out.tell() > 0:
+            with open(output_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Terminate a line left half-written by an interrupted run
+                    out.write("\n")
+        futures = [executor.submit(run_job, job, client, config, batch_session) for job in pending]
+        written = set()
+
+        def write(future):
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            written.add(future)
+            results.append(record)
+            if on_result:
+                on_result(record)
+
+        try:
+            for future in as_completed(futures):
+                write(future)
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            batch_session.cancel()
+            # Record what the running jobs return once they notice the cancellation
+            for future in futures:
+                if not future.cancelled() and future not in written:
+                    write(future)
+            raise
+    return results
@@ -0,0 +1,154 @@
+"""On-disk cache for chat completions, with record/replay modes.
+
+Responses are keyed on a hash of the request (model, tools schema and
+serialized messages), so re-asking the same question about an unchanged tree
+skips inference entirely.
+
+Modes:
+    off:    no caching.
+    on:     serve hits from disk, store misses, evict least recently used
+            entries beyond ``max_bytes``.
+    record: always call the model and store every response (no eviction).
+    replay: only serve from disk; a miss raises CacheMissError. Together with
+            ``record`` this re-runs a whole session offline.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+from craft_code.utils import to_jsonable
+
+CACHE_MODES = ("off", "on", "record", "replay")
+
+# Request options that do not change the response
+IGNORED_KWARGS = {"timeout", "extra_headers"}
+
+
+class CacheMissError(RuntimeError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def request_key(kwargs):
+    """Return a stable hash for a ``chat.completions.create`` request.
+
+    Messages coming from a MessageStore carry a digest of the history, which
+    is used instead of re-serializing every message; only messages not
+    hashed for an earlier request are hashed.
+    """
+    payload = {key: to_jsonable(value) for key, value in kwargs.items() if key not in IGNORED_KWARGS | {"messages"}}
+    messages = kwargs.get("messages")
+    payload["messages"] = getattr(messages, "digest", None) or to_jsonable(messages)
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Size-bounded directory of cached responses with LRU eviction."""
+
+    def __init__(self, path, mode="on", max_bytes=256 * 1024 * 1024):
+        """Initialize the cache.
+
+        Args:
+            path (str | Path): Directory holding one JSON file per response.
+            mode (str): One of CACHE_MODES.
+            max_bytes (int): Size bound enforced in ``on`` mode.
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}'. Expected one of: {', '.join(CACHE_MODES)}.")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = sum(entry.stat().st_size for entry in self.path.glob("*.json"))
+
+    def _file(self, key):
+        return self.path / f"{key}.json"
+
+    def get(self, key):
+        """Return the cached response body for ``key``, or None."""
+        path = self._file(key)
+        try:
+            data = path.read_text(encoding="utf-8")
+        except OSError:
+            self.misses += 1
+            return None
+        # Touch the entry so eviction is least-recently-used
+        os.utime(path)
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Store a response body and evict old entries if over budget."""
+        path = self._file(key)
+        try:
+            self._size -= path.stat().st_size
+        except OSError:
+            pass
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(data, encoding="utf-8")
+        os.replace(tmp_path, path)
+        self._size += len(data.encode("utf-8"))
+        if self.mode == "on":
+            self._evict()
+
+    def _evict(self):
+        if self._size <= self.max_bytes:
+            return
+        entries = sorted(self.path.glob("*.json"), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                entry.unlink()
+                self._size -= size
+            except OSError:
+                continue
+
+
+class CachingClient:
+    """Wraps an OpenAI client so ``chat.completions.create`` goes through a cache.
+
+    Streaming requests are passed through uncached in ``on`` mode. In
+    ``record`` and ``replay`` modes they are refused, since they would either
+    go unrecorded or silently reach the live server; the agent loop turns
+    streaming off there (see `allows_streaming`). Every other attribute is
+    delegated to the wrapped client.
+    """
+
+    def __init__(self, client, cache):
+        self._client = client
+        self.cache = cache
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    @property
+    def allows_streaming(self):
+        """False when every response must go through the cache (record/replay)."""
+        return self.cache.mode not in {"record", "replay"}
+
+    def _create(self, **kwargs):
+        from openai.types.chat import ChatCompletion
+
+        if kwargs.get("stream"):
+            if not self.allows_streaming:
+                raise CacheMissError(f"Streaming requests cannot be served in cache mode '{self.cache.mode}'.")
+            return self._client.chat.completions.create(**kwargs)
+
+        key = request_key(kwargs)
+        if self.cache.mode in {"on", "replay"}:
+            data = self.cache.get(key)
+            if data is not None:
+                return ChatCompletion.model_validate_json(data)
+            if self.cache.mode == "replay":
+                raise CacheMissError(f"No recorded response for request {key[:12]} in {self.cache.path}.")
+
+        response = self._client.chat.completions.create(**kwargs)
+        self.cache.put(key, response.model_dump_json())
+        return response
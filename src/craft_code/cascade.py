@@ -0,0 +1,112 @@
+"""Two-tier model cascade: a fast model for tool steps, a strong one for answers.
+
+Every turn is first sent to the fast model. Its response is kept when it only
+asks for read-only tool calls with valid arguments. The turn is re-issued to
+the strong model when the fast model produces a final answer, wants to call a
+mutating tool (any tool not registered as read-only, e.g. ``write_file`` or
+``run_command``), or emits tool arguments that cannot be repaired.
+
+Streaming requests go through the cascade too. The fast model's stream is
+read to the end and checked the same way; if it is kept, its chunks are
+replayed to the caller, otherwise the strong model's stream is returned.
+"""
+from types import SimpleNamespace
+
+from craft_code.arguments import parse_arguments
+from craft_code.registry import get_tool
+from craft_code.streaming import StreamAbandoned, StreamAssembler, aborted
+
+
+def invalid_tool_call(tool_call, schemas):
+    """Return a reason why a tool call is unusable, or None if it is valid.
+
+    Args:
+        tool_call: Tool call from a ChatCompletionMessage.
+        schemas (dict): Tool name to JSON schema of its parameters.
+    """
+    name = tool_call.function.name
+    if name not in schemas:
+        return f"unknown tool '{name}'"
+    # Arguments that can be repaired are as good as valid ones
+    _, error = parse_arguments(name, tool_call.function.arguments, schemas[name])
+    return error["error"] if error else None
+
+
+class CascadeClient:
+    """Client-like wrapper that routes each turn to a fast or a strong model."""
+
+    def __init__(self, fast_client, fast_model, strong_client, strong_model, escalate_tools=()):
+        """Initialize the cascade.
+
+        Args:
+            fast_client: OpenAI-compatible client serving the fast model.
+            fast_model (str): Model used for tool-selection turns.
+            strong_client: OpenAI-compatible client serving the strong model.
+            strong_model (str): Model used for answers and mutating turns.
+            escalate_tools (iterable): Read-only tools whose calls also go to
+                the strong model (mutating tools always do).
+        """
+        self.fast_client = fast_client
+        self.fast_model = fast_model
+        self.strong_client = strong_client
+        self.strong_model = strong_model
+        self.escalate_tools = set(escalate_tools)
+        self.stats = {"fast": 0, "strong": 0, "escalations": 0}
+        self.last_escalation = None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def __getattr__(self, name):
+        return getattr(self.strong_client, name)
+
+    def _strong(self, kwargs):
+        self.stats["strong"] += 1
+        return self.strong_client.chat.completions.create(**{**kwargs, "model": self.strong_model})
+
+    def _fast_stream(self, kwargs):
+        """Read the fast model's stream; return its chunks and the assembled response."""
+        assembler = StreamAssembler()
+        chunks = []
+        stream = self.fast_client.chat.completions.create(**{**kwargs, "model": self.fast_model})
+        try:
+            for chunk in stream:
+                if aborted():
+                    raise StreamAbandoned()
+                chunks.append(chunk)
+                assembler.feed(chunk)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        return chunks, assembler.completion(self.fast_model)
+
+    def _create(self, **kwargs):
+        self.stats["fast"] += 1
+        if kwargs.get("stream"):
+            chunks, response = self._fast_stream(kwargs)
+        else:
+            response = self.fast_client.chat.completions.create(**{**kwargs, "model": self.fast_model})
+        reason = self.escalation_reason(response.choices[0].message, kwargs.get("tools") or [])
+        self.last_escalation = reason
+        if reason is None:
+            return iter(chunks) if kwargs.get("stream") else response
+
+        self.stats["escalations"] += 1
+        return self._strong(kwargs)
+
+    def escalation_reason(self, message, tools):
+        """Return why a fast-model turn must go to the strong model, or None."""
+        if not message.tool_calls:
+            return "final answer"
+
+        schemas = {tool["function"]["name"]: tool["function"].get("parameters", {}) for tool in tools}
+        for tool_call in message.tool_calls:
+            name = tool_call.function.name
+            entry = get_tool(name)
+            if entry is not None and not entry.read_only:
+                return f"mutating tool '{name}'"
+            if name in self.escalate_tools:
+                return f"escalated tool '{name}'"
+            reason = invalid_tool_call(tool_call, schemas)
+            if reason:
+                return reason
+        return None
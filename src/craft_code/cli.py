@@ -1,11 +1,12 @@
 import sys
+import uuid
 import typer
 import tomllib
-from openai import OpenAI
 from craft_code.core import run_agent
-from craft_code.utils import set_base_dir
-from craft_code.config.prompts import SYSTEM_PROMPT
-from craft_code.config.loader import get_active_model_config, load_config, save_config
+from craft_code.client import create_client
+from craft_code.session import Session
+from craft_code.config.prompts import build_system_prompt
+from craft_code.config.loader import DEFAULT_CONFIG, load_config, save_config
 
 app = typer.Typer(
     name="craft-code",
@@ -21,10 +22,12 @@ def configure():
 
     current = load_config()
     provider = typer.prompt(
-        "Select provider [lm_studio / ollama / openai]",
+        "Select provider [lm_studio / ollama / ollama_native / openai]",
         default="lm_studio"
     )
 
+    if provider not in current["models"] and provider in DEFAULT_CONFIG["models"]:
+        current["models"] = {**current["models"], provider: dict(DEFAULT_CONFIG["models"][provider])}
     if provider not in current["models"]:
         typer.echo(f"❌ Unknown provider: {provider}")
         raise typer.Exit(code=1)
@@ -40,6 +43,13 @@ def configure():
         typer.echo("Local mode detected — API key not required.")
         api_key = api_key or provider
 
+    if model_cfg.get("api") == "ollama":
+        typer.echo("Native Ollama API — the model is kept loaded between requests.")
+        keep_alive = typer.prompt("Keep model loaded for (e.g. 30m, -1 = forever)", default=str(model_cfg.get("keep_alive", "30m")))
+        # Plain numbers are seconds for Ollama, durations need a unit
+        model_cfg["keep_alive"] = int(keep_alive) if keep_alive.lstrip("-").isdigit() else keep_alive
+        model_cfg["num_ctx"] = typer.prompt("Context window (num_ctx, 0 = model default)", default=model_cfg.get("num_ctx", 8192), type=int)
+
     current["provider"] = provider
     current["models"][provider]["base_url"] = base_url
     current["models"][provider]["model"] = model
@@ -53,32 +63,54 @@ def ask(
     question: str = typer.Argument(..., help="Question to ask Craft Code"),
     logs: bool = typer.Option(False, "--logs", help="Enable debug logs"),
     workspace: str = typer.Option(".", "--workspace", help="Set workspace directory"),
+    cache: str = typer.Option(None, "--cache", help="Completion cache mode: off, on, record or replay"),
+    cache_path: str = typer.Option(None, "--cache-path", help="Directory for cached / recorded completions"),
+    no_daemon: bool = typer.Option(False, "--no-daemon", help="Run in-process even if a daemon is running"),
+    profile: bool = typer.Option(False, "--profile", help="Profile the session and write flamegraph-ready output"),
 ):
     """Ask a single question to Craft Code."""
-    cfg = get_active_model_config()
-    set_base_dir(workspace)
-    client = OpenAI(base_url=cfg["base_url"], api_key=cfg["api_key"])
+    if _use_daemon(no_daemon or profile, cache, cache_path):
+        _ask_daemon([{"role": "user", "content": question}], workspace, logs)
+        return
+
+    with _profiled(profile):
+        session = _open_session(workspace, logs)
+        client = create_client(session.model_config, cache_mode=cache, cache_path=cache_path)
 
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": question},
-    ]
+        messages = [
+            {"role": "system", "content": build_system_prompt(session)},
+            {"role": "user", "content": question},
+        ]
 
-    run_agent(messages=messages, client=client, verbose=logs)
+        run_agent(messages=messages, client=client, verbose=logs, session=session)
+        if logs:
+            _report_tools(session.turn_stats)
 
 @app.command("chat")
 def chat(
     logs: bool = typer.Option(False, "--logs", help="Enable debug logs"),
     workspace: str = typer.Option(".", "--workspace", help="Set workspace directory"),
+    cache: str = typer.Option(None, "--cache", help="Completion cache mode: off, on, record or replay"),
+    cache_path: str = typer.Option(None, "--cache-path", help="Directory for cached / recorded completions"),
+    no_daemon: bool = typer.Option(False, "--no-daemon", help="Run in-process even if a daemon is running"),
+    profile: bool = typer.Option(False, "--profile", help="Profile the session and write flamegraph-ready output"),
 ):
     """Start an interactive chat session with Craft Code."""
-    cfg = get_active_model_config()
-    set_base_dir(workspace)
-    client = OpenAI(base_url=cfg["base_url"], api_key=cfg["api_key"])
+    with _profiled(profile):
+        _chat(logs, workspace, cache, cache_path, _use_daemon(no_daemon or profile, cache, cache_path))
 
-    typer.echo("⚒️ Craft Code session started. Type 'exit' or 'quit' to end.\n")
+def _chat(logs, workspace, cache, cache_path, use_daemon):
+    """Run the interactive chat loop."""
+    if use_daemon:
+        typer.echo("🔌 Connected to the Craft Code daemon.")
+        session_id = uuid.uuid4().hex
+        messages = []
+    else:
+        session = _open_session(workspace, logs)
+        client = create_client(session.model_config, cache_mode=cache, cache_path=cache_path)
+        messages = [{"role": "system", "content": build_system_prompt(session)}]
 
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    typer.echo("⚒️ Craft Code session started. Type 'exit' or 'quit' to end.\n")
 
     while True:
         try:
@@ -96,9 +128,131 @@ def chat(
             break
 
         messages.append({"role": "user", "content": user_input})
-        messages = run_agent(messages=messages, client=client, verbose=logs)
+        if use_daemon:
+            messages = _ask_daemon(messages, workspace, logs, session_id=session_id)
+        else:
+            messages = run_agent(messages=messages, client=client, verbose=logs, session=session)
+            if logs:
+                _report_tools(session.turn_stats)
         typer.echo("") # Add spacing between interactions
 
+@app.command("serve")
+def serve(
+    logs: bool = typer.Option(False, "--logs", help="Enable debug logs"),
+    socket: str = typer.Option(None, "--socket", help="Unix socket path (default: ~/.cache/craft-code/daemon.sock)"),
+):
+    """Run a Craft Code daemon that keeps clients and caches warm."""
+    from craft_code.daemon import Daemon
+
+    daemon = Daemon(path=socket, verbose=logs)
+    typer.echo(f"🛰️  Craft Code daemon listening on {daemon.path} (Ctrl+C to stop)")
+    try:
+        daemon.serve_forever()
+    except RuntimeError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(code=1)
+    except KeyboardInterrupt:
+        typer.echo("\n👋 Daemon stopped.")
+
+def _profiled(enabled):
+    """Profile the enclosed block when ``--profile`` is set."""
+    from craft_code.profiler import profiling
+
+    def on_written(collapsed_path, summary_path):
+        typer.echo(f"📊 Profile written to {collapsed_path} (collapsed stacks) and {summary_path} (summary)")
+
+    return profiling(enabled, on_written=on_written)
+
+def _open_session(workspace, logs=False):
+    """Create the session for an in-process command."""
+    session = Session(workspace)
+    typer.echo(f"📁 Workspace set to: {session.workspace}")
+    if logs:
+        session.on_output = lambda line: typer.echo(f"   │ {line}")
+    return session
+
+def _report_tools(stats):
+    """Print the tools offered in the last turn, the prompt tokens saved and the cache invalidations."""
+    if stats.get("tools"):
+        typer.echo(
+            f"🧰 Tools offered: {', '.join(stats['tools'])} (~{stats['prompt_tokens_saved']} prompt tokens saved, "
+            f"{stats['cache_invalidations']} cache invalidation(s), ~{stats['invalidated_tokens']} tokens re-processed)"
+        )
+
+def _use_daemon(no_daemon, cache, cache_path):
+    """Return True if this invocation should be served by a running daemon."""
+    if no_daemon or cache or cache_path:
+        # Per-invocation client options only apply in-process
+        return False
+    from craft_code.daemon import is_running
+    return is_running()
+
+def _ask_daemon(messages, workspace, logs, session_id=None):
+    """Run a turn on the daemon, printing the answer as it streams back."""
+    from craft_code.daemon import ask as daemon_ask
+
+    def on_event(event):
+        if event["event"] == "tool" and logs:
+            typer.echo(f"🔧 {event['tool_name']}: {event.get('arguments')}")
+        elif event["event"] == "output" and logs:
+            typer.echo(f"   │ {event['line']}")
+        elif event["event"] == "stats" and logs:
+            _report_tools(event)
+        elif event["event"] == "message" and event.get("content"):
+            typer.echo(event["content"])
+
+    try:
+        return daemon_ask(messages, workspace, on_event=on_event, verbose=logs, session_id=session_id)
+    except KeyboardInterrupt:
+        # Closing the connection cancelled the turn on the daemon
+        typer.echo("⏹️ Cancelled.")
+        return messages
+    except (OSError, RuntimeError) as e:
+        typer.echo(f"❌ Daemon error: {e}")
+        raise typer.Exit(code=1)
+
+@app.command("batch")
+def batch(
+    input_path: str = typer.Argument(..., help="JSONL file with one {id, question, workspace} job per line"),
+    output: str = typer.Option("batch_results.jsonl", "--output", "-o", help="JSONL file results are appended to"),
+    concurrency: int = typer.Option(4, "--concurrency", "-c", help="Maximum number of jobs running at once"),
+    cache: str = typer.Option(None, "--cache", help="Completion cache mode: off, on, record or replay"),
+    cache_path: str = typer.Option(None, "--cache-path", help="Directory for cached / recorded completions"),
+):
+    """Run many questions concurrently and stream results to a JSONL file."""
+    from craft_code.batch import completed_ids, load_jobs, run_batch
+    from craft_code.config.loader import load_config
+
+    try:
+        jobs = load_jobs(input_path)
+    except (OSError, ValueError) as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(code=1)
+
+    skipped = len(completed_ids(output) & {job["id"] for job in jobs})
+    if skipped:
+        typer.echo(f"⏭️  Resuming: {skipped} job(s) already completed in {output}")
+
+    client = create_client(cache_mode=cache, cache_path=cache_path)
+    total = len(jobs) - skipped
+    finished = 0
+
+    def on_result(record):
+        nonlocal finished
+        finished += 1
+        icon = {"ok": "✅", "cancelled": "⏹️"}.get(record["status"], "❌")
+        typer.echo(f"{icon} [{finished}/{total}] {record['id']} ({record['elapsed']:.1f}s)")
+
+    try:
+        results = run_batch(jobs, client, output, concurrency=concurrency, on_result=on_result, config=load_config())
+    except KeyboardInterrupt:
+        typer.echo(f"\n⏹️ Batch interrupted after {finished} job(s). Results in {output}; run again to resume.")
+        raise typer.Exit(code=130)
+    failed = sum(1 for record in results if record["status"] != "ok")
+    typer.echo(f"\n📦 Batch finished: {len(results) - failed} succeeded, {failed} failed. Results in {output}")
+    if failed:
+        raise typer.Exit(code=1)
+
 @app.command("version")
 def version():
     """Display Craft Code version."""
@@ -112,13 +266,15 @@ def tui(
     ctx: typer.Context,
     logs: bool = typer.Option(False, "--logs", help="Enable debug logs"),
     workspace: str = typer.Option(".", "--workspace", help="Set workspace directory"),
+    profile: bool = typer.Option(False, "--profile", help="Profile the session and write flamegraph-ready output"),
 ):
     """Launch Craft Code TUI (default behavior)."""
     if ctx.invoked_subcommand is None:
         # Launch TUI
         from craft_code.tui.app import CraftCodeApp
-        app_instance = CraftCodeApp(workspace=workspace)
-        app_instance.run()
+        with _profiled(profile):
+            app_instance = CraftCodeApp(workspace=workspace)
+            app_instance.run()
 
 def main():
     if len(sys.argv) == 1:
@@ -0,0 +1,100 @@
+from craft_code.config.loader import CACHE_DIR, get_active_model_config, get_section
+
+
+def create_client(cfg=None, cache_mode=None, cache_path=None):
+    """Build the chat client for the active provider.
+
+    Args:
+        cfg (dict, optional): Provider config, defaults to the active one.
+        cache_mode (str, optional): Overrides ``[cache] mode`` (off, on, record, replay).
+        cache_path (str, optional): Overrides ``[cache] path``.
+
+    Returns:
+        An OpenAI client (or a CascadeClient / ProviderRouter when
+        ``[cascade]`` / ``[router]`` is enabled), wrapped in a CachingClient
+        when caching is enabled.
+    """
+    cfg = cfg or get_active_model_config()
+    router_settings = get_section("router")
+    cascade_settings = get_section("cascade")
+    if cascade_settings["enabled"]:
+        client = create_cascade(cascade_settings)
+    elif router_settings["enabled"]:
+        client = create_router(router_settings)
+    else:
+        client = create_provider_client(cfg)
+
+    settings = get_section("cache")
+    mode = cache_mode or settings["mode"]
+    if mode == "off":
+        return client
+
+    from craft_code.cache import CachingClient, CompletionCache
+    path = cache_path or settings["path"] or CACHE_DIR / "completions"
+    return CachingClient(client, CompletionCache(path, mode=mode, max_bytes=settings["max_bytes"]))
+
+
+def create_provider_client(cfg):
+    """Build the client for a single provider.
+
+    Providers with ``api = "ollama"`` use the native OllamaClient; all others
+    go through the OpenAI-compatible API, wrapped in an AbortableClient so a
+    cancelled turn closes its HTTP request.
+
+    Args:
+        cfg (dict): Provider config from `get_active_model_config`.
+    """
+    if cfg.get("api") == "ollama":
+        from craft_code.ollama import OllamaClient
+        return OllamaClient(
+            base_url=cfg["base_url"],
+            keep_alive=cfg["keep_alive"],
+            num_ctx=cfg["num_ctx"],
+            num_thread=cfg["num_thread"],
+            num_batch=cfg["num_batch"],
+        )
+
+    from openai import OpenAI
+    from craft_code.streaming import AbortableClient
+    return AbortableClient(OpenAI(base_url=cfg["base_url"], api_key=cfg["api_key"] or cfg["provider"]))
+
+
+def create_router(settings):
+    """Build a ProviderRouter over the providers listed in ``[router]``."""
+    from craft_code.router import Endpoint, ProviderRouter
+
+    endpoints = []
+    for provider in settings["providers"]:
+        cfg = get_active_model_config(provider)
+        if not cfg["base_url"]:
+            print(f"Router: skipping unknown provider '{provider}'.")
+            continue
+        endpoints.append(Endpoint(provider, create_provider_client(cfg), cfg["model"]))
+
+    return ProviderRouter(
+        endpoints,
+        hedge_delay=settings["hedge_delay"],
+        probe_interval=settings["probe_interval"],
+        probe_timeout=settings["probe_timeout"],
+    )
+
+
+def create_cascade(settings):
+    """Build a CascadeClient from the ``[cascade.fast]`` and ``[cascade.strong]`` tiers."""
+    from craft_code.cascade import CascadeClient
+
+    clients = {}
+    for tier in ("fast", "strong"):
+        provider = settings[tier]["provider"]
+        cfg = get_active_model_config(provider)
+        if not cfg["base_url"]:
+            raise ValueError(f"Cascade: unknown provider '{provider}' for the {tier} model.")
+        clients[tier] = create_provider_client(cfg)
+
+    return CascadeClient(
+        fast_client=clients["fast"],
+        fast_model=settings["fast"]["model"],
+        strong_client=clients["strong"],
+        strong_model=settings["strong"]["model"],
+        escalate_tools=settings["escalate_tools"],
+    )
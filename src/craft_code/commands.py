@@ -0,0 +1,261 @@
+"""Sandboxed execution of allowlisted commands for the ``run_command`` tool.
+
+Commands run without a shell, inside the workspace, in their own process
+group and under CPU, memory and wall-clock limits. The whole group is killed
+when the command times out, is cancelled or the caller is interrupted, and
+any leftover background processes are killed once it exits. The rlimits are
+set by a small Python wrapper that then execs the command, because a
+``preexec_fn`` is unsafe in a process running other threads.
+
+Arguments must not point outside the workspace, and flags known to write
+files or change the directory a tool operates on are refused. The combined
+stdout/stderr is streamed line by line to an optional callback (the TUI log
+panel) while only a bounded head/tail summary is returned to the model.
+"""
+import os
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+from craft_code.utils import safe_path
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def split_command(command):
+    """Split a command line into argv, without shell interpretation.
+
+    Raises:
+        ValueError: If the command is empty or badly quoted.
+    """
+    argv = shlex.split(command)
+    if not argv:
+        raise ValueError("Empty command.")
+    return argv
+
+
+def is_allowed(argv, allowed):
+    """Return True if ``argv`` starts with one of the allowlisted prefixes.
+
+    Args:
+        argv (list[str]): Command to check.
+        allowed (list[str]): Allowed command prefixes, e.g. ``"git diff"``.
+    """
+    for prefix in allowed:
+        prefix_argv = shlex.split(prefix)
+        if prefix_argv and argv[:len(prefix_argv)] == prefix_argv:
+            return True
+    return False
+
+
+# Flags that write files or redirect a tool outside the workspace
+DENIED_FLAGS = (
+    "--output",  # git diff/log, ruff
+    "--output-file",
+    "--basetemp",  # pytest: wipes the given directory
+    "--junitxml",
+    "--junit-xml",
+    "--cache-dir",
+    "--no-index",  # git diff on arbitrary files
+    "-C",  # git: run in another directory
+    "--git-dir",
+    "--work-tree",
+    "--exec-path",
+)
+
+
+def _denied_flag(arg):
+    """Return the denied flag ``arg`` uses, in any of its spellings, or None."""
+    flag = arg.partition("=")[0]
+    if flag in DENIED_FLAGS:
+        return flag
+    if not arg.startswith("--"):
+        # Short flags also take their value attached: -C/tmp
+        for denied in DENIED_FLAGS:
+            if len(denied) == 2 and arg.startswith(denied):
+                return denied
+    return None
+
+
+def check_arguments(argv, workspace):
+    """Return why ``argv`` may not run, or None if its arguments are safe.
+
+    Denied flags are refused in every form: ``-C dir``, ``-Cdir``,
+    ``--flag value`` and ``--flag=value``. Every argument, every ``=value``
+    part and the value attached to a short flag (``-o/tmp/x``) are resolved
+    against the workspace, so absolute paths and ``..`` escapes are refused
+    too.
+
+    Args:
+        argv (list[str]): Command to check.
+        workspace (str): Absolute workspace directory.
+    """
+    for arg in argv[1:]:
+        flag = _denied_flag(arg)
+        if flag:
+            return f"flag not allowed: {flag}"
+        candidates = [arg]
+        if "=" in arg:
+            candidates.append(arg.partition("=")[2])
+        if len(arg) > 2 and arg[0] == "-" and arg[1] != "-":
+            candidates.append(arg[2:])
+        for candidate in candidates:
+            if not candidate:
+                continue
+            try:
+                safe_path(candidate, workspace)
+            except ValueError:
+                return f"argument outside the workspace: {arg}"
+    return None
+
+
+# Applies the rlimits given as argv[1:3], then execs the command in argv[3:]
+_LIMITS_WRAPPER = """\
+import os, resource, sys
+cpu, memory = int(sys.argv[1]), int(sys.argv[2])
+if cpu:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+if memory:
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+os.execv(sys.argv[3], sys.argv[3:])
+"""
+
+
+def _limit_resources(argv, cpu_seconds, max_memory_mb):
+    """Return ``argv`` wrapped so it runs under the given rlimits.
+
+    Raises:
+        FileNotFoundError: If the command is not found (the wrapper would
+            only report it as an exit code).
+    """
+    if resource is None or not (cpu_seconds or max_memory_mb):
+        return argv
+    executable = shutil.which(argv[0])
+    if executable is None:
+        raise FileNotFoundError(f"command not found: {argv[0]}")
+    memory = max_memory_mb * 1024 * 1024 if max_memory_mb else 0
+    return [sys.executable, "-c", _LIMITS_WRAPPER, str(cpu_seconds or 0), str(memory), executable, *argv[1:]]
+
+
+def _kill(process):
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class _Output:
+    """Keeps the head and tail of a stream within a character budget."""
+
+    def __init__(self, max_chars):
+        self.half = max(1, max_chars // 2)
+        self.head = []
+        self.head_chars = 0
+        self.tail = deque()
+        self.tail_chars = 0
+        self.lines = 0
+        self.omitted = 0
+
+    def add(self, line):
+        self.lines += 1
+        if self.head_chars + len(line) <= self.half and not self.tail:
+            self.head.append(line)
+            self.head_chars += len(line) + 1
+            return
+        self.tail.append(line)
+        self.tail_chars += len(line) + 1
+        while self.tail_chars > self.half and len(self.tail) > 1:
+            self.tail_chars -= len(self.tail.popleft()) + 1
+            self.omitted += 1
+
+    def text(self):
+        parts = self.head
+        if self.omitted:
+            parts = parts + [f"... [{self.omitted} lines omitted] ..."]
+        return "\n".join(parts + [line[-self.half:] for line in self.tail])
+
+
+def run_command(argv, cwd, timeout=120, cpu_seconds=0, max_memory_mb=0, max_output_chars=8000,
+                on_output=None, cancelled=None):
+    """Run a command and return a summary of its output.
+
+    Args:
+        argv (list[str]): Command to run.
+        cwd (str): Working directory.
+        timeout (float): Wall-clock limit in seconds (0 for none).
+        cpu_seconds (int): CPU time limit (0 for none).
+        max_memory_mb (int): Address-space limit in MiB (0 for none).
+        max_output_chars (int): Size of the head/tail summary.
+        on_output (Callable, optional): Called with every output line as it arrives.
+        cancelled (Callable, optional): Polled; returning True kills the command.
+
+    Returns:
+        dict: Exit code, duration, whether it timed out or was cancelled, and
+        the output summary.
+    """
+    output = _Output(max_output_chars)
+    start = time.monotonic()
+    process = subprocess.Popen(
+        _limit_resources(argv, cpu_seconds, max_memory_mb),
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        start_new_session=True,
+    )
+
+    def read():
+        try:
+            for raw in process.stdout:
+                line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                output.add(line)
+                if on_output:
+                    on_output(line)
+        except (OSError, ValueError):
+            pass  # Pipe closed after a timeout
+
+    reader = threading.Thread(target=read, name="craft-command-output", daemon=True)
+    reader.start()
+
+    timed_out = was_cancelled = False
+    try:
+        while True:
+            try:
+                process.wait(timeout=0.1)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if timeout and time.monotonic() - start > timeout:
+                timed_out = True
+            elif cancelled and cancelled():
+                was_cancelled = True
+            else:
+                continue
+            break
+    finally:
+        # The group is in its own session, so Ctrl+C never reaches it: always kill it
+        _kill(process)
+        process.wait()
+
+    reader.join(timeout=5)
+    process.stdout.close()
+    return {
+        "exit_code": process.returncode,
+        "duration": round(time.monotonic() - start, 2),
+        "timed_out": timed_out,
+        "cancelled": was_cancelled,
+        "lines": output.lines,
+        "truncated": bool(output.omitted),
+        "output": output.text(),
+    }
@@ -10,21 +10,126 @@ DEFAULT_CONFIG = {
             "base_url": "http://localhost:1234/v1",
             "model": "qwen/qwen3-4b-2507",
             "api_key": "lm-studio",
+            "embedding_model": "text-embedding-nomic-embed-text-v1.5",
         },
         "ollama": {
             "base_url": "http://localhost:11434/v1",
             "model": "qwen3:4b",
             "api_key": "ollama",
+            "embedding_model": "nomic-embed-text",
+        },
+        "ollama_native": {
+            "api": "ollama",
+            "base_url": "http://localhost:11434",
+            "model": "qwen3:4b",
+            "api_key": "",
+            "embedding_model": "nomic-embed-text",
+            "keep_alive": "30m",
+            "num_ctx": 8192,
+            "num_thread": 0,
+            "num_batch": 0,
         },
         "openai": {
             "base_url": "https://api.openai.com/v1",
             "model": "gpt-5",
             "api_key": "",
+            "embedding_model": "text-embedding-3-small",
         },
     },
+    "agent": {
+        "max_steps": 25,
+        "max_seconds": 0,
+        "max_tokens": 0,
+        "request_timeout": 300.0,
+        "max_parallel_tools": 4,
+        "constrained_tools": False,
+        "stream": False,
+        "dynamic_tools": True,
+    },
+    "semantic_search": {
+        "chunk_lines": 40,
+        "chunk_overlap": 10,
+        "batch_size": 64,
+        "max_file_size": 256 * 1024,
+    },
+    "repo_map": {
+        "enabled": True,
+        "max_tokens": 1024,
+        "max_files": 2000,
+    },
+    "pagination": {
+        "enabled": True,
+        "default_page_size": 100,
+        "max_page_chars": 16000,
+        "page_sizes": {
+            "list_directory": 200,
+            "search_in_file": 50,
+            "semantic_search": 10,
+        },
+    },
+    "prefetch": {
+        "enabled": False,
+        "max_bytes": 4 * 1024 * 1024,
+    },
+    "cache": {
+        "mode": "off",
+        "path": "",
+        "max_bytes": 256 * 1024 * 1024,
+    },
+    "router": {
+        "enabled": False,
+        "providers": ["lm_studio", "ollama"],
+        "hedge_delay": 0.0,
+        "probe_interval": 30.0,
+        "probe_timeout": 3.0,
+    },
+    "cascade": {
+        "enabled": False,
+        "escalate_tools": [],
+        "fast": {"provider": "lm_studio", "model": "qwen/qwen3-1.7b"},
+        "strong": {"provider": "lm_studio", "model": "qwen/qwen3-4b-2507"},
+    },
+    "daemon": {
+        "socket": "",
+    },
+    "commands": {
+        "enabled": False,
+        "allowed": [
+            "pytest",
+            "python -m pytest",
+            "python -m unittest",
+            "ruff",
+            "mypy",
+            "git status",
+            "git diff",
+            "git log",
+            "make test",
+            "npm test",
+            "cargo test",
+            "go test",
+        ],
+        "timeout": 120,
+        "cpu_seconds": 300,
+        "max_memory_mb": 4096,
+        "max_output_chars": 8000,
+    },
+    "delegate": {
+        "max_workers": 4,
+        "max_tasks": 8,
+        "max_steps": 10,
+        "max_result_chars": 2000,
+    },
+    "profile": {
+        "interval_ms": 5,
+        "dir": "",
+    },
 }
 
+# Native Ollama settings (providers with api = "ollama")
+OLLAMA_OPTIONS = ("keep_alive", "num_ctx", "num_thread", "num_batch")
+
 CONFIG_PATH = Path(os.path.expanduser("~/.config/craft-code/config.toml"))
+CACHE_DIR = Path(os.path.expanduser("~/.cache/craft-code"))
 
 def ensure_config_dir():
     CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -49,17 +154,48 @@ def load_config():
     merged.update(data)
     return merged
 
-def get_active_model_config():
-    """Return provider configuration for the active model."""
-    cfg = load_config()
-    provider = cfg.get("provider", "lm_studio")
+def get_active_model_config(provider=None, cfg=None):
+    """Return provider configuration for the active model.
+
+    Args:
+        provider (str, optional): Return this provider's settings instead of the active one.
+        cfg (dict, optional): Already loaded configuration, to avoid re-reading the file.
+    """
+    cfg = cfg or load_config()
+    provider = provider or cfg.get("provider", "lm_studio")
     model_cfg = cfg.get("models", {}).get(provider, {})
-    return {
+    default_cfg = DEFAULT_CONFIG["models"].get(provider, {})
+    active = {
         "provider": provider,
+        "api": model_cfg.get("api", default_cfg.get("api", "openai")),
         "base_url": model_cfg.get("base_url"),
         "api_key": model_cfg.get("api_key"),
         "model": model_cfg.get("model"),
+        "embedding_model": model_cfg.get("embedding_model", default_cfg.get("embedding_model")),
     }
+    if active["api"] == "ollama":
+        for key in OLLAMA_OPTIONS:
+            active[key] = model_cfg.get(key, default_cfg.get(key, DEFAULT_CONFIG["models"]["ollama_native"][key]))
+    return active
+
+def get_section(name, cfg=None):
+    """Return a config section with defaults filled in for missing keys.
+
+    Nested tables are merged one level deep, so overriding a single entry of
+    e.g. ``[pagination.page_sizes]`` keeps the other defaults.
+
+    Args:
+        name (str): Section name, e.g. "pagination".
+        cfg (dict, optional): Already loaded configuration, to avoid re-reading the file.
+    """
+    cfg = cfg or load_config()
+    section = dict(DEFAULT_CONFIG.get(name, {}))
+    for key, value in cfg.get(name, {}).items():
+        if isinstance(value, dict) and isinstance(section.get(key), dict):
+            section[key] = {**section[key], **value}
+        else:
+            section[key] = value
+    return section
 
 def save_config(config):
     """Save config to CONFIG_PATH."""
@@ -8,13 +8,55 @@ Rules:
 - Never access files outside the current working directory.
 - You can call multiple tools in sequence if needed (e.g., read a file, then write a modified version).
 - When creating or modifying files, keep file names descriptive and consistent with the user’s request.
+- When run_command is available, use it to run tests, linters or git status/diff instead of guessing their output.
+- For questions spanning many files or modules, use delegate to split the work into independent subtasks that run in parallel.
+- Large tool results are paginated: if a result has a non-null "next_cursor", call next_page with it only if you need more.
 - Do not include unnecessary explanations when providing final answers — just summarize results clearly.
 
 Available tools allow you to:
 - Inspect folder contents
 - Read files
 - Search text patterns
+- Search code by meaning (semantic search)
 - Create or update files
+- Run allowlisted commands (tests, linters, git)
 
 If a user asks for something requiring file access, always use the relevant tool before responding.
 """
+
+SUBAGENT_PROMPT = """You are a Craft Code sub-agent working on one subtask of a larger question.
+
+Use the read-only tools to investigate the codebase, then answer the subtask directly.
+Your answer is merged into another agent's context, so keep it short and factual:
+cite file paths (and line numbers when useful), skip pleasantries, and do not ask questions.
+Keep the answer under {max_words} words.
+"""
+
+REPO_MAP_PROMPT = """
+Repository map (most central files first, top-level symbols only):
+{repo_map}
+"""
+
+def build_system_prompt(session):
+    """Return SYSTEM_PROMPT followed by the ranked repository map, when enabled.
+
+    The static instructions come first so the prompt prefix stays identical
+    across workspaces and sessions.
+
+    Args:
+        session (Session): Session whose workspace is mapped.
+    """
+    settings = session.settings("repo_map")
+    if not settings["enabled"]:
+        return SYSTEM_PROMPT
+
+    try:
+        from craft_code.repomap import render_repo_map
+        repo_map = render_repo_map(session, max_tokens=settings["max_tokens"], max_files=settings["max_files"])
+    except Exception as e:
+        print(f"Failed to build repository map: {e}")
+        return SYSTEM_PROMPT
+
+    if not repo_map:
+        return SYSTEM_PROMPT
+    return SYSTEM_PROMPT + REPO_MAP_PROMPT.format(repo_map=repo_map)
@@ -1,97 +1,392 @@
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable, Optional
-from craft_code.tools import tools, execute_tool
+from craft_code.tools import execute_tool
+from craft_code.registry import REGISTRY, get_tool, tool_schemas
+from craft_code.messages import normalize
+from craft_code.arguments import parse_arguments, strict_schema
+from craft_code.streaming import AbortScope, Speculator
+from craft_code.toolselect import history_tokens, previous_tools, schema_tokens, select_tools
 from craft_code.utils import debug_log
-from craft_code.config.loader import get_active_model_config
+from craft_code.session import Session
+
+
+class AgentCancelled(Exception):
+    """Raised inside the agent loop when the session is cancelled."""
+
+
+class BudgetExceeded(Exception):
+    """Raised inside the agent loop when a step, time or token budget runs out."""
+
+
+def _complete(client, request, session, deadline=None, speculator=None):
+    """Run a completion request while watching for cancellation.
+
+    The request runs on a helper thread so the loop can give up on it as
+    soon as the session is cancelled, the time budget runs out or the wait
+    is interrupted (Ctrl+C). The request's `AbortScope` is then aborted,
+    which closes its stream and the HTTP connection so the server stops
+    generating; any speculative tool work is discarded.
+
+    Args:
+        client: OpenAI-compatible client.
+        request (dict): Keyword arguments for ``chat.completions.create``.
+        session (Session): Session whose cancel event is watched.
+        deadline (float, optional): ``time.monotonic()`` value after which to give up.
+        speculator (Speculator, optional): Stream the response through it,
+            starting read-only tool calls before the message is complete.
+
+    Returns:
+        The completion response.
+    """
+    result = {}
+    done = threading.Event()
+    scope = AbortScope()
+
+    def worker():
+        try:
+            with scope:
+                if speculator is not None:
+                    result["response"] = speculator.run(client, request)
+                else:
+                    result["response"] = client.chat.completions.create(**request)
+        except BaseException as e:
+            result["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=worker, name="craft-completion", daemon=True).start()
+    try:
+        while not done.wait(0.1):
+            if session.cancelled:
+                raise AgentCancelled()
+            if deadline is not None and time.monotonic() > deadline:
+                raise BudgetExceeded("time budget exhausted while waiting for the model")
+    except BaseException:
+        # Also on KeyboardInterrupt: never leave the request streaming
+        scope.abort()
+        if speculator is not None:
+            speculator.abandon()
+        raise
+
+    if "error" in result:
+        raise result["error"]
+    return result["response"]
+
+
+def _is_read_only(call):
+    tool_call, _, error = call
+    entry = get_tool(tool_call.function.name)
+    return error is None and entry is not None and entry.read_only
+
+
+def _parse_tool_call(tool_call, allowed=None, finish_reason=None):
+    """Return ``(tool_call, args, error)`` with repaired and validated arguments.
+
+    Truncated arguments are only completed for read-only tools, and never
+    when the response stopped at the length limit.
+
+    Args:
+        tool_call: Tool call from the model response.
+        allowed (set, optional): Names of the tools offered this turn.
+        finish_reason (str, optional): Finish reason of the response.
+    """
+    if allowed is not None and tool_call.function.name not in allowed:
+        return tool_call, None, {"error": f"Tool '{tool_call.function.name}' is not available here."}
+    entry = get_tool(tool_call.function.name)
+    args, error = parse_arguments(
+        tool_call.function.name,
+        tool_call.function.arguments,
+        entry.parameters if entry is not None else None,
+        allow_truncated=entry is not None and entry.read_only and finish_reason != "length",
+    )
+    return tool_call, args, error
+
+
+def _history_message(message, calls):
+    """Return the assistant message to store, with repaired arguments.
+
+    Chat templates parse the arguments of earlier tool calls, so malformed
+    ones would break the next request. Repaired calls store their parsed
+    arguments; calls that could not be parsed store ``{}``.
+    """
+    stored = normalize(message)
+    for stored_call, (tool_call, args, _) in zip(stored["tool_calls"], calls):
+        if args is not None:
+            stored_call["function"]["arguments"] = json.dumps(args)
+            continue
+        try:
+            json.loads(tool_call.function.arguments or "")
+        except ValueError:
+            stored_call["function"]["arguments"] = "{}"
+    return stored
+
+
+def _execute_tool_calls(calls, session, max_parallel=1, verbose=False, speculator=None):
+    """Execute the tool calls of one step, in the model's order.
+
+    Runs of consecutive read-only calls are executed concurrently (up to
+    ``max_parallel`` at once); a mutating call always runs alone, after
+    everything before it has finished. Calls whose arguments could not be
+    parsed are not executed; their error is returned as the output.
+
+    Args:
+        calls (list[tuple]): ``(tool_call, args, error)`` from `_parse_tool_call`.
+        session (Session): Session the tools run in.
+        max_parallel (int): Maximum number of concurrent read-only calls.
+        verbose (bool): Log every execution.
+        speculator (Speculator, optional): Source of results of calls that
+            were started while the response was streaming.
+
+    Yields:
+        tuple: ``(tool_call, args, output)`` in the order of ``calls``.
+    """
+    index = 0
+    while index < len(calls):
+        if session.cancelled:
+            raise AgentCancelled()
+
+        batch = calls[index:index + 1]
+        if max_parallel > 1 and _is_read_only(batch[0]):
+            while index + len(batch) < len(calls) and _is_read_only(calls[index + len(batch)]):
+                batch.append(calls[index + len(batch)])
+        index += len(batch)
+
+        if verbose:
+            for tool_call, args, error in batch:
+                debug_log(f"EXECUTING TOOL: {tool_call.function.name}", args if error is None else error)
+
+        if len(batch) == 1:
+            tool_call, args, error = batch[0]
+            ready = speculator.take(tool_call) if speculator is not None and error is None else None
+            if error is not None:
+                yield tool_call, tool_call.function.arguments, error
+            elif ready is not None:
+                yield tool_call, args, ready.result()
+            else:
+                yield tool_call, args, execute_tool(tool_call.function.name, args, session)
+            continue
+
+        with ThreadPoolExecutor(max_workers=min(max_parallel, len(batch)), thread_name_prefix="craft-tool") as pool:
+            futures = [
+                (speculator.take(tool_call) if speculator is not None else None)
+                or pool.submit(execute_tool, tool_call.function.name, args, session)
+                for tool_call, args, _ in batch
+            ]
+            for (tool_call, args, _), future in zip(batch, futures):
+                yield tool_call, args, future.result()
+
+
+def _notify(message, callback):
+    """Send a status message to the callback, or print it."""
+    if callback:
+        callback(message)
+    else:
+        print(message["content"])
+
 
 def run_agent(
-    messages, 
-    client=None, 
+    messages,
+    client=None,
     verbose=False,
-    callback: Optional[Callable] = None
+    callback: Optional[Callable] = None,
+    session: Optional[Session] = None,
+    tool_names=None,
 ):
     """Run the agent loop until the model produces a final answer.
-    
+
+    The loop stops early when the session is cancelled (``session.cancel()``
+    or Ctrl+C) or when one of the ``[agent]`` budgets runs out: ``max_steps``
+    model calls, ``max_seconds`` of wall-clock time or ``max_tokens`` total
+    tokens. Consecutive read-only tool calls of a step run concurrently (up
+    to ``max_parallel_tools``). With ``stream`` enabled, read-only calls
+    start as soon as their arguments are complete, while the rest of the
+    response is still streaming. With ``dynamic_tools`` enabled, only the
+    tools relevant to the conversation are offered, a list that only grows
+    (see `craft_code.toolselect`); ``session.turn_stats`` reports them, the
+    prompt tokens saved and the prefix-cache invalidations caused by new
+    tools, and its ``stop_reason`` tells how the turn ended: ``answer``,
+    ``empty`` (no content), ``budget`` or ``cancelled``. On
+    cancellation the messages of the unfinished step are dropped, so the
+    history stays valid for the next turn.
+
     Args:
         messages: List of conversation messages
         client: OpenAI client instance
         verbose: Enable verbose logging
         callback: Optional callback function to handle intermediate messages
-        
+        session: Session providing the workspace, config and caches
+            (defaults to a session on the current directory)
+        tool_names: Restrict the tools available to the model (default: all)
+
     Returns:
         Updated messages list
     """
     if client is None:
         raise ValueError("OpenAI client must be provided.")
-    
+
+    if session is None:
+        session = Session()
+
     if verbose:
         debug_log("STEP 1 — Initial messages", messages)
 
-    config = get_active_model_config()
-    model = config["model"]
+    model = session.model_config["model"]
+    limits = session.settings("agent")
+    available = list(REGISTRY) if tool_names is None else list(tool_names)
+    allowed = None if tool_names is None else set(tool_names)
+    full_tokens = schema_tokens(available)
+    session.turn_stats = {
+        "stop_reason": None,
+        "prompt_tokens_saved": 0,
+        "cache_invalidations": 0,
+        "invalidated_tokens": 0,
+    }
+    if limits["dynamic_tools"]:
+        # Grows only: new tools are appended, so the cached prompt prefix changes as rarely as possible
+        offered = select_tools(messages, available, session)
+        before = previous_tools(messages, available, session)
+        if before and offered != before:
+            session.turn_stats["cache_invalidations"] += 1
+            session.turn_stats["invalidated_tokens"] += history_tokens(messages)
+        if verbose:
+            debug_log("TOOLS OFFERED", f"{', '.join(offered)} (~{full_tokens - schema_tokens(offered)} tokens saved per request)")
+    else:
+        offered = available
+    session.turn_stats["tools"] = list(offered)
+    # Streamed responses bypass the completion cache, so recorded/replayed sessions never stream
+    stream = limits["stream"] and getattr(client, "allows_streaming", True)
+    if verbose and limits["stream"] and not stream:
+        debug_log("STREAMING DISABLED", "the completion cache is in record/replay mode")
+    start = time.monotonic()
+    deadline = start + limits["max_seconds"] if limits["max_seconds"] else None
+    total_tokens = 0
+    steps = 0
+    session.reset_cancel()
+    # Tools that call the model themselves (e.g. delegate) use the turn's client
+    session.client = client
 
     while True:
-        response = client.chat.completions.create(
-            model=model,
-            tools=tools,
-            messages=messages,
-        )
+        # Messages of an unfinished step are dropped on cancellation
+        checkpoint = len(messages)
+        speculator = None
+        try:
+            if limits["max_steps"] and steps >= limits["max_steps"]:
+                raise BudgetExceeded(f"reached the maximum of {limits['max_steps']} steps")
+            if limits["max_tokens"] and total_tokens >= limits["max_tokens"]:
+                raise BudgetExceeded(f"used {total_tokens} tokens (budget: {limits['max_tokens']})")
+            steps += 1
 
-        message = response.choices[0].message
-        if verbose:
-            debug_log("MODEL RESPONSE", message.model_dump())
-
-        # Execute all tool calls
-        if message.tool_calls:
-            messages.append(message)
-            
-            for tool_call in message.tool_calls:
-                tool_name = tool_call.function.name
-                args = json.loads(tool_call.function.arguments)
-                
-                if verbose:
-                    debug_log(f"EXECUTING TOOL: {tool_name}", args)
-
-                tool_output = execute_tool(tool_name, args)
-                
-                if verbose:
-                    debug_log(f"TOOL OUTPUT ({tool_name})", tool_output)
-                
-                # Notify callback about tool execution
-                if callback:
-                    callback({
+            request_tools = tool_schemas(offered)
+            if limits["constrained_tools"]:
+                request_tools = [strict_schema(schema) for schema in request_tools]
+            session.turn_stats["prompt_tokens_saved"] += full_tokens - schema_tokens(offered)
+
+            # Carries the history digest; only the completion cache reads (and computes) it
+            request = {"model": model, "tools": request_tools, "messages": session.message_store.sync(messages)}
+            if limits["request_timeout"]:
+                request["timeout"] = limits["request_timeout"]
+            if stream:
+                speculator = Speculator(session, max_workers=limits["max_parallel_tools"], allowed=allowed)
+            response = _complete(client, request, session, deadline, speculator)
+            if response.usage is not None:
+                total_tokens += response.usage.total_tokens or 0
+
+            message = response.choices[0].message
+            if verbose:
+                debug_log("MODEL RESPONSE", message.model_dump())
+                if getattr(client, "last_escalation", None):
+                    debug_log("CASCADE ESCALATED TO STRONG MODEL", client.last_escalation)
+
+            # Execute all tool calls
+            if message.tool_calls:
+                # Malformed arguments are repaired, or reported back to the model
+                finish_reason = response.choices[0].finish_reason
+                calls = [_parse_tool_call(tool_call, allowed, finish_reason) for tool_call in message.tool_calls]
+                messages.append(_history_message(message, calls))
+                # A tool that was not offered still runs, and is offered from now on
+                new = [name for name in dict.fromkeys(call.function.name for call in message.tool_calls)
+                       if name in available and name not in offered]
+                if new:
+                    offered = offered + new
+                    session.turn_stats["tools"] = list(offered)
+                    session.turn_stats["cache_invalidations"] += 1
+                    session.turn_stats["invalidated_tokens"] += history_tokens(messages)
+                for tool_call, args, tool_output in _execute_tool_calls(
+                    calls, session, max_parallel=limits["max_parallel_tools"], verbose=verbose, speculator=speculator
+                ):
+                    tool_name = tool_call.function.name
+                    content = json.dumps(tool_output)
+
+                    if verbose:
+                        debug_log(f"TOOL OUTPUT ({tool_name})", tool_output)
+
+                    # Notify callback about tool execution
+                    if callback:
+                        callback({
+                            "role": "tool",
+                            "tool_name": tool_name,
+                            "arguments": args,
+                            "content": content,
+                        })
+
+                    messages.append({
                         "role": "tool",
-                        "tool_name": tool_name,
-                        "content": json.dumps(tool_output)
+                        "tool_call_id": tool_call.id,
+                        "content": content,
                     })
 
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call.id,
-                    "content": json.dumps(tool_output),
-                })
+                if verbose and speculator is not None:
+                    debug_log("SPECULATIVE RESULTS USED", f"{speculator.hits}/{len(calls)} tool call(s)")
 
-            # Continue looping for possible multi-step tool calls
-            continue
+                # Continue looping for possible multi-step tool calls
+                continue
+
+        except (AgentCancelled, KeyboardInterrupt):
+            del messages[checkpoint:]
+            if verbose:
+                debug_log("CANCELLED", f"after {steps} step(s)")
+            session.turn_stats["stop_reason"] = "cancelled"
+            _notify({"role": "system", "content": "⏹️ Cancelled."}, callback)
+            return messages
+
+        except BudgetExceeded as e:
+            del messages[checkpoint:]
+            if verbose:
+                debug_log("BUDGET EXCEEDED", str(e))
+            stop_message = {"role": "assistant", "content": f"⚠️ Stopped: {e}."}
+            messages.append(stop_message)
+            session.turn_stats["stop_reason"] = "budget"
+            _notify(stop_message, callback)
+            return messages
+
+        finally:
+            if speculator is not None:
+                speculator.close()
 
         # No more tool calls -> final answer
         if message.content:
             if verbose:
                 debug_log("FINAL ANSWER", message.content)
                 print("\n✅ FINAL ANSWER:\n" + "-"*80)
-            print(message.content)
-            
+            if not callback:
+                print(message.content)
+
             final_message = {"role": "assistant", "content": message.content}
             messages.append(final_message)
-            
+            session.turn_stats["stop_reason"] = "answer"
+
             # Notify callback about final message
             if callback:
                 callback(final_message)
-            
+
             return messages
 
         # Safety guard
         if response.choices[0].finish_reason == "stop":
+            session.turn_stats["stop_reason"] = "empty"
             if not callback:
                 print("Model ended without content.")
             return messages
@@ -0,0 +1,265 @@
+"""Long-running daemon serving agent sessions over a Unix socket.
+
+``craft-code serve`` keeps the chat client, the semantic indexes, the
+prefetch cache and the paginated results warm across invocations. ``ask`` and
+``chat`` connect to it as thin clients when it is running.
+
+The protocol is newline-delimited JSON. A client sends one request per
+connection::
+
+    {"op": "ask", "workspace": "/abs/path", "messages": [...], "session": "id", "verbose": false}
+
+and the daemon streams events back until the turn is over::
+
+    {"event": "tool", "tool_name": "...", "arguments": {...}, "content": "..."}
+    {"event": "output", "line": "..."}
+    {"event": "message", "role": "assistant", "content": "..."}
+    {"event": "done", "messages": [...]}
+    {"event": "error", "error": "..."}
+
+``session`` is optional: turns sharing an id reuse one Session (and thus its
+paginated results and prefetch cache); without it each turn gets a fresh one.
+While a turn runs, the client may send ``{"op": "cancel"}`` on the same
+connection; the turn stops and still ends with ``done``. Closing the
+connection cancels the turn too. ``{"op": "ping"}`` answers ``{"event": "pong"}``.
+"""
+import json
+import os
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+
+from craft_code.config.loader import CACHE_DIR, get_section, load_config
+from craft_code.utils import to_jsonable
+
+MAX_SESSIONS = 64
+
+
+def socket_path():
+    """Return the configured daemon socket path."""
+    return get_section("daemon")["socket"] or str(CACHE_DIR / "daemon.sock")
+
+
+def _send(stream, event):
+    stream.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+    stream.flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError as e:
+            _send(self.wfile, {"event": "error", "error": f"Invalid request: {e}"})
+            return
+
+        op = request.get("op")
+        if op == "ping":
+            _send(self.wfile, {"event": "pong", "pid": os.getpid()})
+        elif op == "ask":
+            try:
+                self.server.owner.ask(request, lambda event: _send(self.wfile, event), watch=self._watch)
+            except OSError:
+                pass  # The client went away
+        else:
+            _send(self.wfile, {"event": "error", "error": f"Unknown op '{op}'"})
+
+
+    def _watch(self, session, running):
+        """Cancel the turn on a ``cancel`` op or when the client disconnects."""
+        def run():
+            try:
+                line = self.rfile.readline()
+                op = json.loads(line).get("op") if line else "cancel"
+            except (OSError, ValueError):
+                op = "cancel"
+            if op == "cancel" and running.is_set():
+                session.cancel()
+
+        threading.Thread(target=run, name="craft-daemon-watch", daemon=True).start()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon:
+    """Owns the shared client and serves agent turns to thin clients."""
+
+    def __init__(self, path=None, verbose=False):
+        """Initialize the daemon.
+
+        Args:
+            path (str, optional): Socket path, defaults to `socket_path()`.
+            verbose (bool): Log every turn to the daemon's stdout.
+        """
+        from craft_code.client import create_client
+
+        self.path = path or socket_path()
+        self.verbose = verbose
+        self.config = load_config()
+        self.client = create_client()
+        self.server = None
+        self.sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_session(self, session_id, workspace):
+        """Return the session for ``session_id``, creating it if needed."""
+        from craft_code.session import Session
+
+        if not session_id:
+            return Session(workspace, config=self.config)
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None or session.workspace != os.path.realpath(workspace):
+                session = Session(workspace, config=self.config)
+                self.sessions[session_id] = session
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > MAX_SESSIONS:
+                _, evicted = self.sessions.popitem(last=False)
+                evicted.close()
+        return session
+
+    def ask(self, request, emit, watch=None):
+        """Run one agent turn and stream its events through ``emit``.
+
+        Args:
+            request (dict): The ``ask`` request.
+            emit (Callable): Sends an event to the client.
+            watch (Callable, optional): Called with the session and an event
+                set while the turn runs; used to cancel it from the connection.
+        """
+        from craft_code.core import run_agent
+        from craft_code.config.prompts import build_system_prompt
+
+        workspace = request.get("workspace") or os.getcwd()
+        messages = request.get("messages") or []
+        if not os.path.isdir(workspace):
+            emit({"event": "error", "error": f"Workspace not found: {workspace}"})
+            return
+
+        def callback(message):
+            if message.get("role") == "tool":
+                emit({"event": "tool", **message})
+            else:
+                emit({"event": "message", **message})
+
+        session = self.get_session(request.get("session"), workspace)
+        session.on_output = lambda line: emit({"event": "output", "line": line})
+        running = threading.Event()
+        running.set()
+        if watch is not None:
+            watch(session, running)
+        try:
+            if not messages or messages[0].get("role") != "system":
+                messages.insert(0, {"role": "system", "content": build_system_prompt(session)})
+            messages = run_agent(
+                messages=messages,
+                client=self.client,
+                verbose=request.get("verbose", False) or self.verbose,
+                callback=callback,
+                session=session,
+            )
+        except Exception as e:
+            emit({"event": "error", "error": f"{type(e).__name__}: {e}"})
+            return
+        finally:
+            running.clear()
+            if not request.get("session"):
+                session.close()
+        emit({"event": "stats", **session.turn_stats})
+        emit({"event": "done", "messages": to_jsonable(messages)})
+
+    def serve_forever(self):
+        """Bind the socket and serve until interrupted."""
+        if os.path.exists(self.path):
+            if is_running(self.path):
+                raise RuntimeError(f"A Craft Code daemon is already listening on {self.path}.")
+            os.unlink(self.path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.server = _Server(self.path, _Handler)
+        self.server.owner = self
+        os.chmod(self.path, 0o600)
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+def _connect(path, timeout=None):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    sock.connect(path)
+    return sock
+
+
+def is_running(path=None):
+    """Return True if a daemon answers on the socket."""
+    path = path or socket_path()
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return False
+    try:
+        with _connect(path, timeout=1.0) as sock:
+            sock.sendall(b'{"op": "ping"}\n')
+            reply = sock.makefile("rb").readline()
+        return json.loads(reply).get("event") == "pong"
+    except (OSError, ValueError):
+        return False
+
+
+def ask(messages, workspace, on_event=None, verbose=False, path=None, session_id=None):
+    """Run one agent turn on the daemon (thin-client side).
+
+    Args:
+        messages (list[dict]): Conversation so far; a system prompt is added
+            by the daemon when missing.
+        workspace (str): Workspace directory for this turn.
+        on_event (Callable, optional): Called with every streamed event.
+        verbose (bool): Ask the daemon to log the turn.
+        path (str, optional): Socket path, defaults to `socket_path()`.
+        session_id (str, optional): Keeps the daemon-side session across turns.
+
+    Returns:
+        list[dict]: The updated conversation.
+
+    The first Ctrl+C asks the daemon to cancel the turn and waits for it to
+    end; a second one closes the connection, which cancels it as well.
+
+    Raises:
+        RuntimeError: If the daemon reports an error or drops the connection.
+        KeyboardInterrupt: On a second Ctrl+C.
+    """
+    request = {
+        "op": "ask",
+        "workspace": os.path.realpath(workspace),
+        "messages": messages,
+        "session": session_id,
+        "verbose": verbose,
+    }
+    with _connect(path or socket_path()) as sock:
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        stream = sock.makefile("rb")
+        cancelling = False
+        while True:
+            try:
+                line = stream.readline()
+            except KeyboardInterrupt:
+                if cancelling:
+                    raise
+                cancelling = True
+                sock.sendall(b'{"op": "cancel"}\n')
+                continue
+            if not line:
+                break
+            event = json.loads(line)
+            if on_event:
+                on_event(event)
+            if event["event"] == "done":
+                return event["messages"]
+            if event["event"] == "error":
+                raise RuntimeError(event["error"])
+    raise RuntimeError("Connection to the Craft Code daemon was closed unexpectedly.")
@@ -0,0 +1,123 @@
+"""Concurrent sub-agents for the ``delegate`` tool.
+
+Repository-wide questions would otherwise walk the codebase one file per
+model step. With ``delegate`` the main agent splits the work into
+independent subtasks. Each runs as an isolated sub-agent with its own short
+history and only the read-only tools. A process-wide semaphore sized by
+``[delegate] max_workers`` bounds the sub-agents running at once, even when
+several ``delegate`` calls run in parallel. Only the condensed answers are
+returned to the parent conversation.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from craft_code.config.loader import get_section
+from craft_code.registry import REGISTRY
+
+# Tools never offered to sub-agents (no recursive fan-out)
+EXCLUDED_TOOLS = {"delegate"}
+
+_slots = {}  # max_workers -> semaphore shared by every delegate call
+_slots_lock = threading.Lock()
+
+
+def _subagent_slots(max_workers):
+    """Return the process-wide semaphore bounding concurrent sub-agents."""
+    with _slots_lock:
+        if max_workers not in _slots:
+            _slots[max_workers] = threading.BoundedSemaphore(max(1, max_workers))
+        return _slots[max_workers]
+
+
+def subagent_tools():
+    """Return the names of the tools sub-agents may use."""
+    return [name for name, entry in REGISTRY.items() if entry.read_only and name not in EXCLUDED_TOOLS]
+
+
+def _condense(text, max_chars):
+    text = (text or "").strip()
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + " …[truncated]"
+
+
+# How a sub-agent's turn ended -> status and error reported to the parent
+STOP_STATUSES = {
+    "answer": ("ok", None),
+    "budget": ("stopped", None),  # the error is the agent's stop message
+    "cancelled": ("cancelled", "the turn was cancelled"),
+    "empty": ("empty", "the sub-agent ended without an answer"),
+}
+
+
+def run_subtask(session, task, index, settings):
+    """Run one sub-agent to completion and return its condensed result.
+
+    Args:
+        session (Session): Parent session.
+        task (str): Subtask given to the sub-agent.
+        index (int): Position of the subtask, used in progress lines.
+        settings (dict): The ``[delegate]`` settings.
+
+    Returns:
+        dict: ``task``, ``status`` (ok, stopped, cancelled, empty or error)
+        and ``result`` (ok only) or ``error``.
+    """
+    from craft_code.core import run_agent
+    from craft_code.config.prompts import SUBAGENT_PROMPT
+
+    config = {
+        **session.config,
+        "agent": {**get_section("agent", session.config), "max_steps": settings["max_steps"]},
+    }
+    child = session.fork(config=config)
+    start = time.monotonic()
+
+    def callback(message):
+        if message.get("role") == "tool" and session.on_output:
+            session.on_output(f"[sub-agent {index}] 🔧 {message['tool_name']} {message['arguments']}")
+
+    messages = [
+        {"role": "system", "content": SUBAGENT_PROMPT.format(max_words=settings["max_result_chars"] // 6)},
+        {"role": "user", "content": task},
+    ]
+    record = {"task": task}
+    try:
+        with _subagent_slots(settings["max_workers"]):
+            messages = run_agent(
+                messages, client=session.client, callback=callback, session=child, tool_names=subagent_tools()
+            )
+        reason = child.turn_stats.get("stop_reason")
+        status, error = STOP_STATUSES.get(reason, ("error", f"unexpected stop reason: {reason}"))
+        record["status"] = status
+        final = messages[-1] if messages and messages[-1].get("role") == "assistant" else {}
+        if status == "ok":
+            record["result"] = _condense(final.get("content"), settings["max_result_chars"])
+        else:
+            record["error"] = error or final.get("content") or reason
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        child.close()
+    record["elapsed"] = round(time.monotonic() - start, 2)
+    return record
+
+
+def run_subtasks(session, tasks):
+    """Run subtasks concurrently, at most ``max_workers`` sub-agents at a time.
+
+    Args:
+        session (Session): Parent session; its client runs the sub-agents.
+        tasks (list[str]): Independent subtasks.
+
+    Returns:
+        list[dict]: One result per subtask, in the given order.
+    """
+    settings = session.settings("delegate")
+    tasks = [str(task).strip() for task in tasks if str(task).strip()][:settings["max_tasks"]]
+    workers = max(1, min(settings["max_workers"], len(tasks)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="craft-subagent") as pool:
+        futures = [pool.submit(run_subtask, session, task, i, settings) for i, task in enumerate(tasks, start=1)]
+        return [future.result() for future in futures]
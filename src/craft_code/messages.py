@@ -0,0 +1,98 @@
+"""Incremental digest of the conversation history.
+
+Every model request carries the whole history, and hashing it from scratch
+for each request (e.g. for the completion cache key) is O(n²) work over a
+session. The MessageStore keeps one compact record per message; the rolling
+digest of the history up to a message is only computed when a request's
+``digest`` is read, which only the completion cache does, and then only for
+messages that have not been hashed before. Earlier messages are recognized
+by identity. Without the cache, building a request costs no hashing at all.
+
+The request body is encoded by the client: the OpenAI library encodes the
+whole history, while the native Ollama client reuses the encoding of every
+message it has sent before.
+
+Messages must therefore be treated as immutable once appended: replace a
+message rather than editing it in place.
+"""
+import hashlib
+import json
+
+from craft_code.utils import to_jsonable
+
+
+def normalize(message):
+    """Return a message as a plain JSON-compatible dict (pydantic models included)."""
+    return to_jsonable(message)
+
+
+class MessageRecord:
+    """One message and, once computed, the digest of the history ending with it."""
+
+    __slots__ = ("message", "digest")
+
+    def __init__(self, message):
+        self.message = message
+        self.digest = None
+
+
+def _history_digest(records):
+    """Return the digest of ``records``, hashing only the records not hashed yet."""
+    start = len(records)
+    while start > 0 and records[start - 1].digest is None:
+        start -= 1
+    previous = records[start - 1].digest if start else b""
+    for record in records[start:]:
+        encoded = json.dumps(normalize(record.message), ensure_ascii=False, sort_keys=True).encode("utf-8")
+        record.digest = previous = hashlib.sha256(previous + encoded).digest()
+    return previous.hex() if records else hashlib.sha256(b"").hexdigest()
+
+
+class MessageList(list):
+    """A list of messages that can also report its history digest.
+
+    It is passed as ``messages`` to ``chat.completions.create``. Wrappers that
+    need a key for the request (the completion cache) read ``digest`` instead
+    of re-serializing the history.
+    """
+
+    __slots__ = ("_records",)
+
+    def __init__(self, records):
+        super().__init__(record.message for record in records)
+        self._records = records
+
+    @property
+    def digest(self):
+        return _history_digest(self._records)
+
+
+class MessageStore:
+    """Keeps the records of a conversation in sync with its messages."""
+
+    def __init__(self):
+        self._records = []
+
+    def sync(self, messages):
+        """Record the messages appended since the last call.
+
+        Records (and their digests) are reused for the longest prefix of
+        ``messages`` whose items are the very same objects as before.
+
+        Args:
+            messages (list): Conversation history.
+
+        Returns:
+            MessageList: The messages, ready to be sent.
+        """
+        keep = 0
+        for record, message in zip(self._records, messages):
+            if record.message is not message:
+                break
+            keep += 1
+        del self._records[keep:]
+        self._records.extend(MessageRecord(message) for message in messages[keep:])
+        return MessageList(list(self._records))
+
+    def __len__(self):
+        return len(self._records)
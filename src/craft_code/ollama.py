@@ -0,0 +1,293 @@
+"""Native Ollama client using the ``/api/chat`` endpoint.
+
+Ollama's OpenAI-compatible ``/v1`` shim gives no control over how long a
+model stays loaded or over its runtime options, so multi-GB models get
+unloaded after a few idle minutes and reloaded cold mid-session. This client
+talks to the native API instead. It sends ``keep_alive`` and ``options``
+(``num_ctx``, ``num_thread``, ``num_batch``) with every request and streams
+the NDJSON response, which also lets a cancelled turn close the connection
+and stop generation.
+
+It exposes the subset of the OpenAI client interface the rest of Craft Code
+uses: ``chat.completions.create`` (including ``stream=True``),
+``embeddings.create``, ``models.list`` and ``with_options``. Responses are
+returned as OpenAI ``ChatCompletion`` / ``ChatCompletionChunk`` objects, so
+the cache, router and cascade work unchanged. Only the standard library is
+used for HTTP.
+"""
+import json
+import time
+import urllib.error
+import urllib.request
+import uuid
+from types import SimpleNamespace
+
+from craft_code.streaming import StreamAbandoned, aborted
+from craft_code.utils import to_jsonable
+
+# OpenAI request parameters and their Ollama ``options`` names
+OPENAI_OPTIONS = {
+    "temperature": "temperature",
+    "top_p": "top_p",
+    "seed": "seed",
+    "stop": "stop",
+    "max_tokens": "num_predict",
+    "max_completion_tokens": "num_predict",
+    "frequency_penalty": "frequency_penalty",
+    "presence_penalty": "presence_penalty",
+}
+
+
+class OllamaError(RuntimeError):
+    """Raised when the Ollama server returns an error."""
+
+
+def _to_ollama_message(message, tool_names):
+    """Convert an OpenAI-format message to Ollama's chat format.
+
+    Args:
+        message (dict): OpenAI-format message.
+        tool_names (dict): Maps tool call ids to tool names, filled in from
+            assistant messages so tool results can be attributed.
+    """
+    converted = {"role": message["role"], "content": message.get("content") or ""}
+    if message.get("tool_calls"):
+        calls = []
+        for call in message["tool_calls"]:
+            function = call["function"]
+            arguments = function.get("arguments") or "{}"
+            if isinstance(arguments, str):
+                try:
+                    arguments = json.loads(arguments)
+                except ValueError:
+                    arguments = {}
+            tool_names[call.get("id")] = function["name"]
+            calls.append({"function": {"name": function["name"], "arguments": arguments}})
+        converted["tool_calls"] = calls
+    if message["role"] == "tool" and message.get("tool_call_id") in tool_names:
+        converted["tool_name"] = tool_names[message["tool_call_id"]]
+    return converted
+
+
+def _openai_tool_calls(calls):
+    """Convert Ollama tool calls to OpenAI's format (arguments as JSON strings)."""
+    return [
+        {
+            "index": index,
+            "id": call.get("id") or f"call_{uuid.uuid4().hex[:24]}",
+            "type": "function",
+            "function": {
+                "name": call["function"]["name"],
+                "arguments": json.dumps(call["function"].get("arguments") or {}),
+            },
+        }
+        for index, call in enumerate(calls)
+    ]
+
+
+def _usage(event):
+    prompt = event.get("prompt_eval_count") or 0
+    completion = event.get("eval_count") or 0
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+class OllamaClient:
+    """Minimal OpenAI-compatible facade over Ollama's native API."""
+
+    def __init__(self, base_url="http://localhost:11434", keep_alive="30m", num_ctx=0, num_thread=0,
+                 num_batch=0, timeout=300.0):
+        """Initialize the client.
+
+        Args:
+            base_url (str): Ollama server URL (a trailing ``/v1`` is ignored).
+            keep_alive (str | int): How long the model stays loaded after a
+                request, e.g. ``"30m"`` or ``-1`` for forever.
+            num_ctx (int): Context window size (0 keeps the model default).
+            num_thread (int): CPU threads (0 lets Ollama decide).
+            num_batch (int): Prompt processing batch size (0 keeps the default).
+            timeout (float): Default socket timeout in seconds.
+        """
+        base_url = base_url.rstrip("/")
+        if base_url.endswith("/v1"):
+            base_url = base_url[:-3]
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.options = {
+            name: value
+            for name, value in (("num_ctx", num_ctx), ("num_thread", num_thread), ("num_batch", num_batch))
+            if value
+        }
+        self.timeout = timeout
+        # id(message) -> (message, encoded converted message, tool names it declares)
+        self._converted = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.models = SimpleNamespace(list=self._list_models)
+
+    def with_options(self, timeout=None, max_retries=None):
+        """Return a copy of the client with another timeout (``max_retries`` is ignored)."""
+        clone = OllamaClient(self.base_url, self.keep_alive, timeout=self.timeout if timeout is None else timeout)
+        clone.options = dict(self.options)
+        return clone
+
+    def _request(self, path, payload=None, timeout=None):
+        """Send a request; ``payload`` is a dict or an already encoded body."""
+        data = payload if payload is None or isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=data,
+            headers={"Content-Type": "application/json"},
+            method="GET" if data is None else "POST",
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=timeout or self.timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                detail = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                detail = e.reason
+            raise OllamaError(f"Ollama {path} failed ({e.code}): {detail}") from e
+
+    def _messages(self, messages):
+        """Return the history as an encoded JSON array.
+
+        Messages seen in the previous request are neither converted nor
+        encoded again, so a request only costs its new messages.
+        """
+        tool_names = {}
+        converted = {}
+        encoded = []
+        for message in messages:
+            cached = self._converted.get(id(message))
+            if cached is None or cached[0] is not message:
+                names = dict(tool_names)
+                item = _to_ollama_message(to_jsonable(message), names)
+                cached = (
+                    message,
+                    json.dumps(item).encode("utf-8"),
+                    {key: names[key] for key in names.keys() - tool_names.keys()},
+                )
+            tool_names.update(cached[2])
+            converted[id(message)] = cached
+            encoded.append(cached[1])
+        self._converted = converted
+        return b"[" + b",".join(encoded) + b"]"
+
+    def _payload(self, kwargs):
+        """Return the encoded ``/api/chat`` request body."""
+        payload = {
+            "model": kwargs["model"],
+            "stream": True,
+            "keep_alive": self.keep_alive,
+        }
+        if kwargs.get("tools"):
+            payload["tools"] = kwargs["tools"]
+        options = dict(self.options)
+        for name, option in OPENAI_OPTIONS.items():
+            if kwargs.get(name) is not None:
+                options[option] = kwargs[name]
+        if options:
+            payload["options"] = options
+        if (kwargs.get("response_format") or {}).get("type") == "json_object":
+            payload["format"] = "json"
+        # The history is spliced in already encoded
+        return b'{"messages": ' + self._messages(kwargs["messages"]) + b", " + json.dumps(payload).encode("utf-8")[1:]
+
+    def _events(self, kwargs):
+        """Yield the NDJSON events of a streamed ``/api/chat`` response.
+
+        Closing the response when the request is aborted makes Ollama stop generating.
+        """
+        with self._request("/api/chat", self._payload(kwargs), timeout=kwargs.get("timeout")) as response:
+            for line in response:
+                if aborted():
+                    raise StreamAbandoned()
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event.get("error"):
+                    raise OllamaError(f"Ollama /api/chat failed: {event['error']}")
+                yield event
+
+    def _create(self, **kwargs):
+        if kwargs.get("stream"):
+            return self._stream(kwargs)
+
+        from openai.types.chat import ChatCompletion
+
+        content = []
+        tool_calls = []
+        event = {}
+        for event in self._events(kwargs):
+            message = event.get("message") or {}
+            content.append(message.get("content") or "")
+            tool_calls.extend(message.get("tool_calls") or [])
+
+        message = {"role": "assistant", "content": "".join(content) or None}
+        if tool_calls:
+            message["tool_calls"] = [
+                {key: value for key, value in call.items() if key != "index"} for call in _openai_tool_calls(tool_calls)
+            ]
+        return ChatCompletion.model_validate({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": kwargs["model"],
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_calls else event.get("done_reason") or "stop",
+            }],
+            "usage": _usage(event),
+        })
+
+    def _stream(self, kwargs):
+        """Yield ``ChatCompletionChunk`` objects as Ollama streams its answer."""
+        from openai.types.chat import ChatCompletionChunk
+
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        tool_index = 0
+        saw_tools = False
+
+        def chunk(delta, finish_reason=None, usage=None):
+            data = {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": kwargs["model"],
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage:
+                data["usage"] = usage
+            return ChatCompletionChunk.model_validate(data)
+
+        for event in self._events(kwargs):
+            message = event.get("message") or {}
+            delta = {}
+            if message.get("content"):
+                delta["content"] = message["content"]
+            if message.get("tool_calls"):
+                calls = _openai_tool_calls(message["tool_calls"])
+                for call in calls:
+                    call["index"] += tool_index
+                tool_index += len(calls)
+                saw_tools = True
+                delta["tool_calls"] = calls
+            if delta:
+                yield chunk({"role": "assistant", **delta})
+            if event.get("done"):
+                reason = "tool_calls" if saw_tools else event.get("done_reason") or "stop"
+                yield chunk({}, finish_reason=reason, usage=_usage(event))
+
+    def _embed(self, model, input, **kwargs):
+        texts = [input] if isinstance(input, str) else list(input)
+        payload = {"model": model, "input": texts, "keep_alive": self.keep_alive}
+        with self._request("/api/embed", payload, timeout=kwargs.get("timeout")) as response:
+            embeddings = json.loads(response.read())["embeddings"]
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=vector) for i, vector in enumerate(embeddings)])
+
+    def _list_models(self):
+        with self._request("/api/tags") as response:
+            models = json.loads(response.read()).get("models", [])
+        return SimpleNamespace(data=[SimpleNamespace(id=model["name"]) for model in models])
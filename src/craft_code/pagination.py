@@ -0,0 +1,104 @@
+"""Cursor-based pagination for large tool outputs.
+
+Results that exceed a tool's page size are kept in a session-side
+ResultStore. The model receives the first page together with an opaque
+cursor it can pass to the ``next_page`` tool to fetch the rest.
+"""
+import json
+import secrets
+import threading
+from collections import OrderedDict
+
+# Dict keys holding the list to paginate, in lookup order
+LIST_FIELDS = ("matches", "results", "entries")
+
+
+class ResultStore:
+    """Bounded store of paginated tool results, evicting the oldest first."""
+
+    def __init__(self, max_entries=32, max_page_chars=16000):
+        """Initialize the store.
+
+        Args:
+            max_entries (int): Number of results kept before the oldest is evicted.
+            max_page_chars (int): Upper bound on the JSON size of a single page.
+        """
+        self.max_entries = max_entries
+        self.max_page_chars = max_page_chars
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def paginate(self, tool_name, output, page_size):
+        """Return ``output`` unchanged, or its first page plus a cursor.
+
+        Args:
+            tool_name (str): Name of the tool that produced the output.
+            output: Tool output (a list, or a dict holding a list).
+            page_size (int): Maximum number of items per page.
+
+        Returns:
+            The original output if it fits in one page, otherwise a dict with
+            the first page, ``total`` and ``next_cursor``.
+        """
+        if isinstance(output, list):
+            field, items, extra = "entries", output, {}
+        elif isinstance(output, dict):
+            field = next((key for key in LIST_FIELDS if isinstance(output.get(key), list)), None)
+            if field is None:
+                return output
+            items = output[field]
+            extra = {key: value for key, value in output.items() if key != field}
+        else:
+            return output
+
+        if len(items) <= page_size and len(json.dumps(output)) <= self.max_page_chars:
+            return output
+
+        token = secrets.token_hex(6)
+        with self._lock:
+            self._entries[token] = {
+                "tool": tool_name,
+                "field": field,
+                "items": items,
+                "extra": extra,
+                "page_size": page_size,
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return self._page(token, 0)
+
+    def next_page(self, cursor):
+        """Return the page a cursor points to.
+
+        Args:
+            cursor (str): Cursor returned by a previous page.
+
+        Returns:
+            dict: The page, or an error if the cursor is unknown or expired.
+        """
+        token, _, offset = str(cursor).partition(":")
+        with self._lock:
+            if token not in self._entries or not offset.isdigit():
+                return {"error": f"Unknown or expired cursor: {cursor}"}
+            self._entries.move_to_end(token)
+            return self._page(token, int(offset))
+
+    def _page(self, token, offset):
+        entry = self._entries[token]
+        items = entry["items"]
+        end = min(offset + entry["page_size"], len(items))
+        page = {**entry["extra"], entry["field"]: items[offset:end]}
+
+        # Shrink the page until it fits the size budget (always keep one item)
+        while end - offset > 1 and len(json.dumps(page)) > self.max_page_chars:
+            end = offset + max(1, (end - offset) // 2)
+            page[entry["field"]] = items[offset:end]
+
+        page["total"] = len(items)
+        page["offset"] = offset
+        if end < len(items):
+            page["next_cursor"] = f"{token}:{end}"
+        else:
+            page["next_cursor"] = None
+            self._entries.pop(token, None)
+        return page
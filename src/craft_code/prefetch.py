@@ -0,0 +1,190 @@
+"""Background prefetching of files the model is likely to read next.
+
+After a file is read or searched, its local imports and sibling test files
+are loaded into a bounded in-memory cache on a background thread, while the
+model is still generating its next step. Cached entries are validated
+against the file's size and mtime before being served.
+"""
+import ast
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+JS_IMPORT_RE = re.compile(r"""(?:from\s+|require\(\s*|import\(\s*)['"](\.{1,2}/[^'"]+)['"]""")
+JS_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs")
+
+
+def _python_imports(path, source, root):
+    """Resolve the workspace files imported by a Python module."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+
+    package_dir = os.path.dirname(path)
+    bases = [root, os.path.join(root, "src")]
+    candidates = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+            search_dirs = bases
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module or ""
+            if node.level:
+                start = package_dir
+                for _ in range(node.level - 1):
+                    start = os.path.dirname(start)
+                search_dirs = [start]
+            else:
+                search_dirs = bases
+            # `from pkg import name` may import a submodule called `name`
+            modules = [module] + [f"{module}.{alias.name}" if module else alias.name for alias in node.names]
+        else:
+            continue
+
+        for module in modules:
+            if not module:
+                continue
+            rel = module.replace(".", os.sep)
+            for base in search_dirs:
+                candidates.append(os.path.join(base, rel + ".py"))
+                candidates.append(os.path.join(base, rel, "__init__.py"))
+    return candidates
+
+
+def _js_imports(path, source):
+    """Resolve relative imports of a JavaScript/TypeScript module."""
+    candidates = []
+    for spec in JS_IMPORT_RE.findall(source):
+        target = os.path.normpath(os.path.join(os.path.dirname(path), spec))
+        candidates.append(target)
+        candidates.extend(target + ext for ext in JS_EXTENSIONS)
+        candidates.extend(os.path.join(target, "index" + ext) for ext in JS_EXTENSIONS)
+    return candidates
+
+
+def _sibling_tests(path, root):
+    """Return candidate test files for a source file."""
+    directory, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    if ext == ".py":
+        names = [f"test_{stem}.py", f"{stem}_test.py"]
+    else:
+        names = [f"{stem}.test{ext}", f"{stem}.spec{ext}"]
+    dirs = [directory, os.path.join(directory, "tests"), os.path.join(root, "tests")]
+    return [os.path.join(d, n) for d in dirs for n in names]
+
+
+def related_files(path, root):
+    """Return existing workspace files likely to be read after ``path``.
+
+    Args:
+        path (str): Absolute path of the file just read.
+        root (str): Absolute workspace path; results never leave it.
+
+    Returns:
+        list: Absolute file paths, without duplicates.
+    """
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            source = f.read()
+    except OSError:
+        return []
+
+    if path.endswith(".py"):
+        candidates = _python_imports(path, source, root)
+    elif path.endswith(JS_EXTENSIONS):
+        candidates = _js_imports(path, source)
+    else:
+        candidates = []
+    candidates += _sibling_tests(path, root)
+
+    seen = set()
+    related = []
+    for candidate in candidates:
+        candidate = os.path.realpath(candidate)
+        if candidate in seen or candidate == path:
+            continue
+        seen.add(candidate)
+        if candidate.startswith(root + os.sep) and os.path.isfile(candidate):
+            related.append(candidate)
+    return related
+
+
+class Prefetcher:
+    """Bounded in-memory file cache filled by a background thread."""
+
+    def __init__(self, max_bytes=4 * 1024 * 1024, max_file_size=20 * 1024):
+        """Initialize the prefetcher.
+
+        Args:
+            max_bytes (int): Total size of cached file contents.
+            max_file_size (int): Files larger than this are never cached.
+        """
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()  # path -> (signature, content)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="craft-prefetch")
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, path):
+        """Return cached content for ``path`` if it is still fresh, else None."""
+        with self._lock:
+            entry = self._cache.get(path)
+        if entry is not None:
+            try:
+                if entry[0] == self._signature(path):
+                    with self._lock:
+                        self._cache.move_to_end(path)
+                    self.hits += 1
+                    return entry[1]
+            except OSError:
+                pass
+        self.misses += 1
+        return None
+
+    def schedule(self, path, root):
+        """Prefetch the files related to ``path`` in the background."""
+        self._executor.submit(self._prefetch_related, path, root)
+
+    def _prefetch_related(self, path, root):
+        for related in related_files(path, root):
+            self._load(related)
+
+    def _load(self, path):
+        try:
+            signature = self._signature(path)
+            if signature[1] > self.max_file_size:
+                return
+            with self._lock:
+                entry = self._cache.get(path)
+                if entry is not None and entry[0] == signature:
+                    return
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                content = f.read()
+        except OSError:
+            return
+
+        with self._lock:
+            previous = self._cache.pop(path, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+            self._cache[path] = (signature, content)
+            self._size += len(content)
+            while self._size > self.max_bytes and self._cache:
+                _, (_, evicted) = self._cache.popitem(last=False)
+                self._size -= len(evicted)
+
+    def shutdown(self):
+        """Stop the background thread, dropping pending prefetches."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,171 @@
+"""Sampling profiler for whole Craft Code sessions.
+
+A background thread snapshots the stacks of every thread at a fixed interval
+(``sys._current_frames``), so time spent in worker threads (completion
+requests, tool runs, prefetching, TUI workers) is captured alongside the main
+thread at a small, constant overhead. Samples are wall-clock: a thread blocked
+on the network or a lock is counted where it waits.
+
+When the session ends two files are written:
+
+- ``<name>.collapsed``: one ``thread;frame;...;frame count`` line per unique
+  stack, ready for ``flamegraph.pl`` or speedscope. Each line starts with the
+  thread track (``main`` or ``worker:<thread name>``).
+- ``<name>.txt``: a per-function summary (self and total samples) for the
+  main thread and for all worker threads together.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from craft_code.config.loader import CACHE_DIR, get_section
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _track(thread_id, names):
+    if thread_id == threading.main_thread().ident:
+        return "main"
+    return f"worker:{names.get(thread_id, thread_id)}"
+
+
+class SamplingProfiler:
+    """Collects stack samples of all threads until stopped."""
+
+    def __init__(self, interval=0.005):
+        """Initialize the profiler.
+
+        Args:
+            interval (float): Seconds between two samples.
+        """
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling in a background thread."""
+        self._stop.clear()
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="craft-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.elapsed = time.monotonic() - self.started
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(_track(thread_id, names))
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Return the samples in collapsed-stack (flamegraph) format."""
+        lines = [f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+    def summary(self, limit=40):
+        """Return a per-function report, split into main and worker tracks.
+
+        Args:
+            limit (int): Number of functions listed per track.
+
+        Returns:
+            str: Human-readable summary.
+        """
+        tracks = {"main": (Counter(), Counter(), Counter()), "workers": (Counter(), Counter(), Counter())}
+        for stack, count in self.stacks.items():
+            self_counts, total_counts, thread_counts = tracks["main" if stack[0] == "main" else "workers"]
+            thread_counts[stack[0]] += count
+            frames = stack[1:]
+            if frames:
+                self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+
+        lines = [
+            f"Craft Code profile: {self.elapsed:.2f}s wall clock, {self.samples} samples "
+            f"every {self.interval * 1000:.1f} ms (wall-clock sampling, waits included)",
+        ]
+        for track, (self_counts, total_counts, thread_counts) in tracks.items():
+            if not thread_counts:
+                continue
+            track_samples = sum(thread_counts.values())
+            lines.append("")
+            lines.append(f"== {track} ({track_samples} thread samples) ==")
+            if track == "workers":
+                for name, count in thread_counts.most_common():
+                    lines.append(f"   {count:>8}  {name}")
+                lines.append("")
+            lines.append(f"{'self':>8} {'self%':>6} {'total':>8} {'total%':>6}  function")
+            ranked = sorted(total_counts, key=lambda label: (self_counts[label], total_counts[label]), reverse=True)
+            for label in ranked[:limit]:
+                own, total = self_counts[label], total_counts[label]
+                lines.append(
+                    f"{own:>8} {own / track_samples:>6.1%} {total:>8} {total / track_samples:>6.1%}  {label}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory, name=None):
+        """Write the collapsed stacks and the summary to ``directory``.
+
+        Returns:
+            tuple[str, str]: Paths of the collapsed-stack and summary files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        name = name or time.strftime("craft-code-%Y%m%d-%H%M%S")
+        collapsed_path = os.path.join(directory, f"{name}.collapsed")
+        summary_path = os.path.join(directory, f"{name}.txt")
+        with open(collapsed_path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(self.summary())
+        return collapsed_path, summary_path
+
+
+@contextmanager
+def profiling(enabled=True, on_written=None):
+    """Profile the enclosed block and write the reports when it exits.
+
+    Args:
+        enabled (bool): When False the block runs unprofiled.
+        on_written (Callable, optional): Called with the two output paths.
+    """
+    if not enabled:
+        yield None
+        return
+
+    settings = get_section("profile")
+    profiler = SamplingProfiler(interval=settings["interval_ms"] / 1000)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        paths = profiler.write(settings["dir"] or str(CACHE_DIR / "profiles"))
+        if on_written:
+            on_written(*paths)
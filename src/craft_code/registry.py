@@ -0,0 +1,189 @@
+"""Declarative tool registry.
+
+Tools are plain functions registered with the `tool` decorator. Their JSON
+schema is derived from the type-annotated signature and the Google-style
+docstring: the summary line becomes the description and the ``Args:`` entries
+describe the parameters. The ``session`` parameter is injected by
+`execute_tool` and never exposed to the model.
+
+Each tool is tagged with:
+
+- ``read_only``: True if it never modifies the workspace. Read-only calls
+  of one model step may run concurrently.
+- ``cost``: one of COST_CLASSES, a rough latency class used when deciding
+  which tools to offer or run in parallel.
+- ``idempotent``: False if a call changes what the next identical call
+  returns (e.g. consuming a cursor). Such calls are never started
+  speculatively, since a discarded result cannot be fetched again.
+"""
+import inspect
+import re
+import types
+import typing
+
+COST_CLASSES = ("low", "medium", "high")
+
+# Parameters filled in by the runtime rather than the model
+INJECTED_PARAMS = {"session"}
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", dict: "object"}
+
+# Registered tools in registration order (the order the model sees them)
+REGISTRY = {}
+
+
+class Tool:
+    """A registered tool: its function, schema and scheduling hints."""
+
+    __slots__ = ("name", "func", "description", "parameters", "read_only", "cost", "idempotent")
+
+    def __init__(self, name, func, description, parameters, read_only, cost, idempotent=True):
+        self.name = name
+        self.func = func
+        self.description = description
+        self.parameters = parameters
+        self.read_only = read_only
+        self.cost = cost
+        self.idempotent = idempotent
+
+    def schema(self):
+        """Return the OpenAI function-calling schema of the tool."""
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": self.parameters,
+            },
+        }
+
+
+def _json_type(annotation):
+    """Translate a type annotation into a JSON schema fragment."""
+    origin = typing.get_origin(annotation)
+    if origin in (typing.Union, types.UnionType):
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return _json_type(args[0]) if len(args) == 1 else {}
+    if origin is list:
+        args = typing.get_args(annotation)
+        return {"type": "array", "items": _json_type(args[0]) if args else {}}
+    if annotation is list:
+        return {"type": "array"}
+    if annotation in _JSON_TYPES:
+        return {"type": _JSON_TYPES[annotation]}
+    return {}
+
+
+def parse_docstring(doc):
+    """Split a Google-style docstring into its summary and argument descriptions.
+
+    Args:
+        doc (str): The docstring.
+
+    Returns:
+        tuple[str, dict]: The summary paragraph and ``{arg: description}``.
+    """
+    lines = inspect.cleandoc(doc or "").splitlines()
+    summary = []
+    for line in lines:
+        if not line.strip():
+            break
+        summary.append(line.strip())
+
+    args = {}
+    current = None
+    arg_indent = None
+    in_args = False
+    for line in lines:
+        if re.match(r"^(Args|Arguments|Parameters):\s*$", line):
+            in_args = True
+            continue
+        if not in_args or not line.strip():
+            continue
+        if not line.startswith(" "):
+            break  # next section (Returns:, Raises:...)
+        indent = len(line) - len(line.lstrip())
+        if arg_indent is None:
+            arg_indent = indent
+        match = re.match(r"^(\w+)\s*(?:\([^)]*\))?\s*:\s*(.*)$", line.strip())
+        if indent == arg_indent and match:
+            current = match.group(1)
+            args[current] = match.group(2).strip()
+        elif current:
+            args[current] = f"{args[current]} {line.strip()}"
+    return " ".join(summary), args
+
+
+def build_parameters(func):
+    """Build the JSON schema of a function's parameters from its signature."""
+    _, arg_docs = parse_docstring(func.__doc__)
+    hints = typing.get_type_hints(func)
+    properties = {}
+    required = []
+    for name, param in inspect.signature(func).parameters.items():
+        if name in INJECTED_PARAMS or param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        prop = _json_type(hints.get(name, inspect.Parameter.empty))
+        description = arg_docs.get(name, "").rstrip(".")
+        if param.default is param.empty:
+            required.append(name)
+        elif param.default is not None and "default" not in description.lower():
+            default = str(param.default).lower() if isinstance(param.default, bool) else param.default
+            description = f"{description} (default {default})".strip()
+        if description:
+            prop["description"] = description
+        properties[name] = prop
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def tool(read_only=False, cost="low", name=None, idempotent=True):
+    """Register a function as a tool.
+
+    Args:
+        read_only (bool): True if the tool never modifies the workspace.
+        cost (str): Latency class, one of COST_CLASSES.
+        name (str, optional): Tool name, defaults to the function name.
+        idempotent (bool): False if repeating a call does not return the
+            same result (it is then never run speculatively).
+
+    Returns:
+        Callable: Decorator returning the function unchanged.
+    """
+    if cost not in COST_CLASSES:
+        raise ValueError(f"Unknown cost class '{cost}'. Expected one of: {', '.join(COST_CLASSES)}.")
+
+    def decorator(func):
+        tool_name = name or func.__name__
+        description, _ = parse_docstring(func.__doc__)
+        REGISTRY[tool_name] = Tool(
+            name=tool_name,
+            func=func,
+            description=description,
+            parameters=build_parameters(func),
+            read_only=read_only,
+            cost=cost,
+            idempotent=idempotent,
+        )
+        return func
+
+    return decorator
+
+
+def get_tool(name):
+    """Return the registered Tool called ``name``, or None."""
+    return REGISTRY.get(name)
+
+
+def tool_schemas(names=None):
+    """Return the schemas of the registered tools.
+
+    Args:
+        names (Iterable[str], optional): Restrict to these tools, in this
+            order (default: all, in registration order).
+
+    Returns:
+        list[dict]: OpenAI function-calling schemas.
+    """
+    if names is None:
+        return [entry.schema() for entry in REGISTRY.values()]
+    return [REGISTRY[name].schema() for name in names if name in REGISTRY]
@@ -0,0 +1,253 @@
+"""Ranked repository map for the system prompt.
+
+Top-level symbols are extracted from every source file in the workspace and
+files are ranked with PageRank over the graph of cross-file references, so
+the most central code is listed first. Extracted tags are cached on disk and
+only recomputed for files whose size or mtime changed.
+"""
+import ast
+import json
+import os
+import re
+
+from craft_code import utils
+
+CACHE_VERSION = 1
+
+SOURCE_EXTENSIONS = {
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".go", ".rs", ".java", ".kt", ".rb",
+    ".c", ".h", ".cc", ".cpp", ".hpp", ".cs", ".swift", ".php", ".scala",
+}
+
+GENERIC_DEF_RE = re.compile(
+    r"^\s*(?:export\s+)?(?:pub(?:\(crate\))?\s+)?(?:public\s+|private\s+|protected\s+|static\s+|abstract\s+|async\s+)*"
+    r"(?:def|class|function|fn|func|interface|struct|enum|trait|type|module)\s+([A-Za-z_]\w*)",
+    re.MULTILINE,
+)
+IDENTIFIER_RE = re.compile(r"[A-Za-z_]\w{2,}")
+
+
+def _python_tags(source):
+    """Extract top-level definitions and referenced names from Python source."""
+    tree = ast.parse(source)
+    defs = []
+    for node in tree.body:
+        if getattr(node, "name", "").startswith("_"):
+            continue
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            args = ", ".join(a.arg for a in node.args.posonlyargs + node.args.args + node.args.kwonlyargs)
+            defs.append([node.name, node.lineno, f"def {node.name}({args})"])
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(b) for b in node.bases)
+            defs.append([node.name, node.lineno, f"class {node.name}({bases})" if bases else f"class {node.name}"])
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and not item.name.startswith("_"):
+                    defs.append([item.name, item.lineno, f"def {node.name}.{item.name}(...)"])
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                if isinstance(target, ast.Name) and target.id.isupper():
+                    defs.append([target.id, node.lineno, target.id])
+
+    refs = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            refs.add(node.id)
+        elif isinstance(node, ast.Attribute):
+            refs.add(node.attr)
+        elif isinstance(node, ast.ImportFrom):
+            refs.update(alias.name for alias in node.names)
+    return defs, refs
+
+
+def _generic_tags(source):
+    """Extract definitions and identifiers from non-Python source with regexes."""
+    defs = []
+    for match in GENERIC_DEF_RE.finditer(source):
+        line = source.count("\n", 0, match.start()) + 1
+        end = source.find("\n", match.start())
+        text = source[match.start():end if end != -1 else len(source)]
+        defs.append([match.group(1), line, text.strip()[:100]])
+    return defs, set(IDENTIFIER_RE.findall(source))
+
+
+def extract_tags(path):
+    """Return ``(defs, refs)`` for a source file.
+
+    Args:
+        path (str): Absolute file path.
+
+    Returns:
+        tuple: ``defs`` is a list of ``[name, line, display]`` and ``refs`` a
+        set of identifiers used in the file.
+    """
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        source = f.read()
+    if path.endswith(".py"):
+        try:
+            return _python_tags(source)
+        except SyntaxError:
+            pass
+    return _generic_tags(source)
+
+
+def pagerank(nodes, edges, damping=0.85, iterations=30):
+    """Compute PageRank over a weighted directed graph.
+
+    Args:
+        nodes (list): Node identifiers.
+        edges (dict): ``{source: {target: weight}}``.
+        damping (float): Damping factor.
+        iterations (int): Number of power iterations.
+
+    Returns:
+        dict: Rank per node, summing to 1.
+    """
+    if not nodes:
+        return {}
+    n = len(nodes)
+    rank = {node: 1.0 / n for node in nodes}
+    out_weight = {node: sum(edges.get(node, {}).values()) for node in nodes}
+
+    for _ in range(iterations):
+        dangling = sum(rank[node] for node in nodes if not out_weight[node])
+        new_rank = {node: (1 - damping + damping * dangling) / n for node in nodes}
+        for source, targets in edges.items():
+            if not out_weight[source]:
+                continue
+            share = damping * rank[source] / out_weight[source]
+            for target, weight in targets.items():
+                new_rank[target] += share * weight
+        rank = new_rank
+    return rank
+
+
+class RepoMap:
+    """Builds and caches the ranked symbol map of a workspace."""
+
+    def __init__(self, root, cache_dir, max_files=2000):
+        """Initialize the repo map.
+
+        Args:
+            root (str): Absolute workspace path.
+            cache_dir (Path): Directory holding the tag cache.
+            max_files (int): Maximum number of source files to scan.
+        """
+        self.root = root
+        self.cache_path = cache_dir / "tags.json"
+        self.max_files = max_files
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache.get("version") == CACHE_VERSION:
+                return cache["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def collect_tags(self):
+        """Return ``{rel_path: {"defs": [...], "refs": [...]}}``, reusing cached tags."""
+        cached = self._load_cache()
+        files = {}
+        changed = False
+
+        for path in utils.iter_workspace_files(self.root, max_size=512 * 1024):
+            if os.path.splitext(path)[1] not in SOURCE_EXTENSIONS:
+                continue
+            if len(files) >= self.max_files:
+                break
+            rel = os.path.relpath(path, self.root)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = [stat.st_mtime_ns, stat.st_size]
+            entry = cached.get(rel)
+            if entry is None or entry["signature"] != signature:
+                try:
+                    defs, refs = extract_tags(path)
+                except OSError:
+                    continue
+                entry = {"signature": signature, "defs": defs, "refs": sorted(refs)}
+                changed = True
+            files[rel] = entry
+
+        if changed or files.keys() != cached.keys():
+            tmp_path = self.cache_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "files": files}, f)
+            os.replace(tmp_path, self.cache_path)
+        return files
+
+    def rank(self, files):
+        """Rank files and their symbols by centrality in the reference graph.
+
+        Returns:
+            list: ``(rel_path, file_rank, defs)`` tuples, most central first,
+            with each file's defs sorted by how much they are referenced.
+        """
+        definers = {}
+        for rel, entry in files.items():
+            for name, _, _ in entry["defs"]:
+                definers.setdefault(name, set()).add(rel)
+
+        edges = {}
+        for rel, entry in files.items():
+            for ident in entry["refs"]:
+                for target in definers.get(ident, ()):
+                    if target != rel:
+                        # Names defined in many files (main, run, ...) carry little signal
+                        weight = 1.0 / len(definers[ident])
+                        targets = edges.setdefault(rel, {})
+                        targets[target] = targets.get(target, 0.0) + weight
+
+        ranks = pagerank(list(files), edges)
+
+        symbol_score = {}
+        for source, targets in edges.items():
+            refs = set(files[source]["refs"])
+            for target in targets:
+                for name, _, _ in files[target]["defs"]:
+                    if name in refs:
+                        key = (target, name)
+                        symbol_score[key] = symbol_score.get(key, 0.0) + ranks[source]
+
+        ranked = []
+        for rel in sorted(files, key=lambda r: (-ranks[r], r)):
+            defs = sorted(files[rel]["defs"], key=lambda d: (-symbol_score.get((rel, d[0]), 0.0), d[1]))
+            ranked.append((rel, ranks[rel], defs))
+        return ranked
+
+    def render(self, max_tokens=1024):
+        """Render the ranked map, trimmed to roughly ``max_tokens`` tokens.
+
+        Tokens are estimated at four characters each.
+        """
+        budget = max_tokens * 4
+        blocks = []
+        used = 0
+        for rel, _, defs in self.rank(self.collect_tags()):
+            if not defs:
+                continue
+            header = f"{rel}:\n"
+            if used + len(header) > budget:
+                break
+            block = header
+            for _, _, display in defs:
+                line = f"  {display}\n"
+                if used + len(block) + len(line) > budget:
+                    break
+                block += line
+            if block == header:
+                break
+            blocks.append(block)
+            used += len(block)
+        return "".join(blocks).rstrip()
+
+
+def render_repo_map(session, max_tokens=1024, max_files=2000):
+    """Render the repository map for the session's workspace."""
+    repo_map = RepoMap(session.workspace, session.cache_dir("repomap"), max_files=max_files)
+    return repo_map.render(max_tokens=max_tokens)
@@ -0,0 +1,206 @@
+"""Latency-aware routing of completions across several configured providers.
+
+Each endpoint keeps a rolling window of request latencies and outcomes and is
+health-probed in the background. Completions go to the fastest healthy
+endpoint, fail over to the next one on error, and can optionally be hedged:
+if the first endpoint has not answered after ``hedge_delay`` seconds, the
+same request is sent to the runner-up and whichever answers first wins; the
+slower request is then aborted. A request aborted by the caller (a cancelled
+turn) is neither recorded as a failure nor retried on another endpoint.
+"""
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+
+from craft_code.streaming import AbortScope, StreamAbandoned, aborted, current_scope
+
+
+class Endpoint:
+    """One provider endpoint and its rolling health statistics."""
+
+    def __init__(self, name, client, model, window=20):
+        """Initialize the endpoint.
+
+        Args:
+            name (str): Provider name from the config (e.g. "lm_studio").
+            client: OpenAI-compatible client for this provider.
+            model (str): Model name to request on this provider.
+            window (int): Number of recent requests used for statistics.
+        """
+        self.name = name
+        self.client = client
+        self.model = model
+        self.healthy = True
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.probe_latency = None
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        """Record the outcome of a completion request."""
+        with self._lock:
+            self.outcomes.append(ok)
+            if ok:
+                self.latencies.append(latency)
+                self.healthy = True
+            else:
+                self.healthy = False
+
+    @property
+    def error_rate(self):
+        with self._lock:
+            if not self.outcomes:
+                return 0.0
+            return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def latency(self):
+        """Median completion latency, falling back to the last probe latency."""
+        with self._lock:
+            if self.latencies:
+                return statistics.median(self.latencies)
+        return self.probe_latency
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "model": self.model,
+            "healthy": self.healthy,
+            "latency": self.latency,
+            "error_rate": round(self.error_rate, 3),
+        }
+
+
+class ProviderRouter:
+    """Client-like router exposing ``chat.completions.create`` over several endpoints."""
+
+    def __init__(self, endpoints, hedge_delay=0.0, probe_interval=30.0, probe_timeout=3.0):
+        """Initialize the router and start the background health probe.
+
+        Args:
+            endpoints (list[Endpoint]): Endpoints in order of preference.
+            hedge_delay (float): Seconds before a hedged request is sent to the
+                second endpoint; 0 disables hedging.
+            probe_interval (float): Seconds between health probes; 0 disables probing.
+            probe_timeout (float): Timeout of a single health probe.
+        """
+        if not endpoints:
+            raise ValueError("ProviderRouter needs at least one endpoint.")
+        self.endpoints = endpoints
+        self.hedge_delay = hedge_delay
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self._executor = ThreadPoolExecutor(max_workers=2 * len(endpoints), thread_name_prefix="craft-router")
+        self._stop = threading.Event()
+        if probe_interval > 0:
+            threading.Thread(target=self._probe_loop, name="craft-router-probe", daemon=True).start()
+
+    def ranked(self):
+        """Return endpoints best first: healthy, then by error-weighted latency.
+
+        Endpoints without measurements keep their configured order ahead of
+        slower measured ones, so they get a chance to be measured.
+        """
+        def score(item):
+            position, endpoint = item
+            latency = endpoint.latency
+            penalty = (latency if latency is not None else 0.0) * (1 + 4 * endpoint.error_rate)
+            return (not endpoint.healthy, penalty, position)
+
+        return [endpoint for _, endpoint in sorted(enumerate(self.endpoints), key=score)]
+
+    def stats(self):
+        """Return a snapshot of per-endpoint statistics."""
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+    def _call(self, endpoint, kwargs):
+        start = time.perf_counter()
+        try:
+            response = endpoint.client.chat.completions.create(**{**kwargs, "model": endpoint.model})
+        except StreamAbandoned:
+            raise
+        except Exception as e:
+            if aborted():
+                # Closing the stream can surface as a connection error
+                raise StreamAbandoned() from e
+            endpoint.record(time.perf_counter() - start, ok=False)
+            raise
+        endpoint.record(time.perf_counter() - start, ok=True)
+        return response
+
+    def _create(self, **kwargs):
+        candidates = self.ranked()
+        if self.hedge_delay > 0 and len(candidates) > 1 and not kwargs.get("stream"):
+            return self._create_hedged(candidates, kwargs)
+
+        error = None
+        for endpoint in candidates:
+            try:
+                return self._call(endpoint, kwargs)
+            except StreamAbandoned:
+                raise
+            except Exception as e:
+                error = e
+        raise error
+
+    def _call_in_scope(self, scope, endpoint, kwargs):
+        with scope:
+            return self._call(endpoint, kwargs)
+
+    def _create_hedged(self, candidates, kwargs):
+        # Each hedged call has its own scope inside the caller's: aborting the turn
+        # aborts them all, and the losing call is aborted once one has answered
+        parent = current_scope()
+        scopes = {}
+
+        def submit(endpoint):
+            scope = AbortScope(parent)
+            future = self._executor.submit(self._call_in_scope, scope, endpoint, kwargs)
+            scopes[future] = scope
+            return future
+
+        pending = {submit(candidates[0])}
+        remaining = list(candidates[1:])
+        done, _ = wait(pending, timeout=self.hedge_delay)
+        error = None
+
+        try:
+            while True:
+                for future in done:
+                    pending.discard(future)
+                    try:
+                        return future.result()
+                    except StreamAbandoned:
+                        raise
+                    except Exception as e:
+                        error = e
+                if remaining and (not done or not pending):
+                    # Hedge a slow request, or fail over after an error
+                    pending.add(submit(remaining.pop(0)))
+                if not pending:
+                    raise error
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        finally:
+            for future in pending:
+                scopes[future].abort()
+
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval):
+            for endpoint in self.endpoints:
+                start = time.perf_counter()
+                try:
+                    endpoint.client.with_options(timeout=self.probe_timeout, max_retries=0).models.list()
+                except Exception:
+                    endpoint.healthy = False
+                    continue
+                endpoint.probe_latency = time.perf_counter() - start
+                endpoint.healthy = True
+
+    def close(self):
+        """Stop health probes and release worker threads."""
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
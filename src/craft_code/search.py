@@ -0,0 +1,148 @@
+"""Fast regex search over a memory-mapped file.
+
+The whole file is scanned with compiled bytes regexes instead of decoding
+and matching it line by line. Each pattern is compiled on its own, so inline
+flags such as ``(?i)`` and backreferences keep their meaning, and each one
+scans the file at most once. Line numbers are only computed for hits, by
+counting newlines since the previous hit, and the scan stops as soon as
+``max_matches`` lines have been found.
+
+Patterns are matched against the raw UTF-8 bytes: ``\\w``, ``\\b``, ``\\s``
+and case-insensitive matching only know ASCII, and ``.`` matches a single
+byte, so a non-ASCII character counts as several.
+"""
+import mmap
+import os
+import re
+
+# Longest line text returned per match (minified files have huge lines)
+MAX_LINE_CHARS = 500
+
+
+def compile_patterns(patterns, case_sensitive=False):
+    """Compile each pattern into a bytes regex.
+
+    Bytes regexes are ASCII-only: ``\\w``, ``\\b`` and case folding do not
+    cover non-ASCII letters, and ``.`` matches one byte.
+
+    Raises:
+        re.error: If a pattern is not a valid regex.
+    """
+    flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+    return [re.compile(pattern.encode("utf-8"), flags) for pattern in patterns]
+
+
+class _FirstMatch:
+    """Finds the earliest match of any of several regexes.
+
+    The next match of every regex is remembered and only searched again
+    once the scan has moved past it, so each regex scans the file once.
+    """
+
+    def __init__(self, regexes, buf):
+        self.buf = buf
+        self.pending = [[regex, None] for regex in regexes]
+
+    def search(self, pos):
+        best = None
+        for item in self.pending:
+            regex, match = item
+            if match is False:
+                continue  # No match left in the file
+            if match is None or match.start() < pos:
+                match = item[1] = regex.search(self.buf, pos) or False
+                if match is False:
+                    continue
+            if best is None or match.start() < best.start():
+                best = match
+        return best
+
+
+def _decode(data):
+    return data.decode("utf-8", errors="ignore")
+
+
+def _lines(data):
+    # Split on "\n" only: splitlines() drops trailing empty lines and splits on lone "\r"
+    return [_decode(line).rstrip()[:MAX_LINE_CHARS] for line in data.split(b"\n")]
+
+
+def _context_before(buf, line_start, count):
+    start = line_start
+    for _ in range(count):
+        if start == 0:
+            break
+        start = buf.rfind(b"\n", 0, start - 1) + 1
+    if start >= line_start:
+        return []
+    return _lines(buf[start:line_start - 1])
+
+
+def _context_after(buf, line_end, count):
+    end = line_end
+    for _ in range(count):
+        if end + 1 >= len(buf):
+            break
+        next_end = buf.find(b"\n", end + 1)
+        end = len(buf) if next_end == -1 else next_end
+    if end <= line_end:
+        return []
+    return _lines(buf[line_end + 1:end])
+
+
+def search_file(path, patterns, before=0, after=0, case_sensitive=False, max_matches=200):
+    """Return the lines of a file matching any of the patterns.
+
+    Args:
+        path (str): Absolute file path.
+        patterns (list[str]): Regex patterns or keywords.
+        before (int): Context lines to include before each match.
+        after (int): Context lines to include after each match.
+        case_sensitive (bool): Match case exactly.
+        max_matches (int): Stop after this many matching lines.
+
+    Returns:
+        tuple: ``(matches, truncated)`` where each match is a dict with
+        ``line`` and ``text`` (plus ``before``/``after`` when requested) and
+        ``truncated`` tells whether more matches exist past ``max_matches``.
+    """
+    regexes = compile_patterns(patterns, case_sensitive)
+    matches = []
+    truncated = False
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return matches, truncated
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            size = len(buf)
+            line_no = 1
+            counted = 0  # newlines before this offset are included in line_no
+            pos = 0
+            finder = _FirstMatch(regexes, buf)
+            while pos < size:
+                match = finder.search(pos)
+                if match is None:
+                    break
+                if len(matches) >= max_matches:
+                    truncated = True
+                    break
+
+                line_start = buf.rfind(b"\n", 0, match.start()) + 1
+                line_end = buf.find(b"\n", match.start())
+                if line_end == -1:
+                    line_end = size
+                # Each gap between hits is sliced once, so the file is counted at most once
+                line_no += buf[counted:line_start].count(b"\n")
+                counted = line_start
+
+                entry = {"line": line_no, "text": _decode(buf[line_start:line_end]).strip()[:MAX_LINE_CHARS]}
+                if before:
+                    entry["before"] = _context_before(buf, line_start, before)
+                if after:
+                    entry["after"] = _context_after(buf, line_end, after)
+                matches.append(entry)
+
+                # One result per line: resume the scan on the next line
+                pos = line_end + 1
+
+    return matches, truncated
@@ -0,0 +1,280 @@
+"""Embedding-based semantic search over the workspace.
+
+Files are split into overlapping line windows, embedded through the active
+provider's embeddings endpoint (``/embeddings``, or ``/api/embed`` for native
+Ollama) and stored as a
+memory-mapped NumPy matrix next to a JSON chunk table. Embeddings are keyed on
+a hash of the chunk content, so refreshing the index only embeds chunks that
+actually changed.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from craft_code import utils
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+INDEX_VERSION = 1
+MAX_CHUNK_CHARS = 4000
+SCORE_BLOCK_ROWS = 65536
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class SemanticIndex:
+    """Incremental embedding index for a single workspace."""
+
+    def __init__(self, root, cache_dir, client, model, settings):
+        """Initialize the index.
+
+        Args:
+            root (str): Absolute workspace path.
+            cache_dir (Path): Directory holding ``vectors.npy`` and ``chunks.json``.
+            client: OpenAI-compatible client used for embeddings.
+            model (str): Embedding model name.
+            settings (dict): The ``semantic_search`` config section.
+        """
+        self.root = root
+        self.cache_dir = cache_dir
+        self.client = client
+        self.model = model
+        self.chunk_lines = max(1, int(settings["chunk_lines"]))
+        self.chunk_overlap = max(0, min(int(settings["chunk_overlap"]), self.chunk_lines - 1))
+        self.batch_size = max(1, int(settings["batch_size"]))
+        self.max_file_size = int(settings["max_file_size"])
+        self.meta_path = cache_dir / "chunks.json"
+        self.vectors_path = cache_dir / "vectors.npy"
+        self.meta = self._load_meta()
+        self.vectors = self._load_vectors()
+        self.lock = threading.Lock()
+
+    def _load_meta(self):
+        empty = {"version": INDEX_VERSION, "model": self.model, "files": {}, "chunks": []}
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return empty
+        if meta.get("version") != INDEX_VERSION or meta.get("model") != self.model:
+            return empty
+        return meta
+
+    def _load_vectors(self):
+        if not self.meta["chunks"] or not self.vectors_path.exists():
+            self.meta["chunks"] = []
+            self.meta["files"] = {}
+            return None
+        vectors = np.load(self.vectors_path, mmap_mode="r")
+        if vectors.shape[0] != len(self.meta["chunks"]):
+            self.meta["chunks"] = []
+            self.meta["files"] = {}
+            return None
+        return vectors
+
+    def _chunk_file(self, path, rel):
+        """Split a file into overlapping line windows."""
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            lines = f.readlines()
+
+        chunks = []
+        step = self.chunk_lines - self.chunk_overlap
+        for start in range(0, max(len(lines), 1), step):
+            window = lines[start:start + self.chunk_lines]
+            text = "".join(window)
+            if not text.strip():
+                continue
+            embed_text = f"{rel}\n{text}"[:MAX_CHUNK_CHARS]
+            chunks.append({
+                "path": rel,
+                "start": start + 1,
+                "end": start + len(window),
+                "hash": hashlib.sha1(embed_text.encode("utf-8")).hexdigest(),
+                "text": embed_text,
+            })
+            if start + self.chunk_lines >= len(lines):
+                break
+        return chunks
+
+    def _embed(self, texts):
+        """Embed texts in batches and return a normalized float32 matrix."""
+        rows = []
+        for i in range(0, len(texts), self.batch_size):
+            response = self.client.embeddings.create(model=self.model, input=texts[i:i + self.batch_size])
+            rows.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+        matrix = np.asarray(rows, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def refresh(self):
+        """Bring the index up to date with the workspace.
+
+        Unchanged files (same size and mtime) are not re-read. Chunks whose
+        content hash is already indexed reuse their stored vector.
+
+        Returns:
+            int: Number of chunks that had to be embedded.
+        """
+        old_files = self.meta["files"]
+        old_chunks = self.meta["chunks"]
+        row_by_hash = {chunk["hash"]: row for row, chunk in enumerate(old_chunks)}
+
+        files = {}
+        chunks = []
+        sources = []  # old row index, or position in `pending`
+        pending = []
+        changed = False
+
+        for path in utils.iter_workspace_files(self.root, max_size=self.max_file_size):
+            rel = os.path.relpath(path, self.root)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = [stat.st_mtime_ns, stat.st_size]
+            previous = old_files.get(rel)
+
+            if previous and previous["signature"] == signature:
+                file_chunks = [dict(old_chunks[row]) for row in previous["rows"]]
+            else:
+                changed = True
+                if utils.is_binary_file(path):
+                    continue
+                try:
+                    file_chunks = self._chunk_file(path, rel)
+                except OSError:
+                    continue
+
+            rows = []
+            for chunk in file_chunks:
+                text = chunk.pop("text", None)
+                if chunk["hash"] in row_by_hash:
+                    sources.append(("old", row_by_hash[chunk["hash"]]))
+                else:
+                    sources.append(("new", len(pending)))
+                    pending.append(text)
+                rows.append(len(chunks))
+                chunks.append(chunk)
+            files[rel] = {"signature": signature, "rows": rows}
+
+        if not changed and files.keys() == old_files.keys():
+            return 0
+
+        new_vectors = self._embed(pending) if pending else None
+        if chunks:
+            dim = (new_vectors if new_vectors is not None else self.vectors).shape[1]
+            matrix = np.empty((len(chunks), dim), dtype=np.float32)
+            for row, (kind, index) in enumerate(sources):
+                matrix[row] = self.vectors[index] if kind == "old" else new_vectors[index]
+            tmp_path = self.cache_dir / "vectors.tmp.npy"
+            np.save(tmp_path, matrix)
+            os.replace(tmp_path, self.vectors_path)
+            self.vectors = np.load(self.vectors_path, mmap_mode="r")
+        else:
+            self.vectors = None
+
+        self.meta = {"version": INDEX_VERSION, "model": self.model, "files": files, "chunks": chunks}
+        tmp_meta = self.cache_dir / "chunks.tmp.json"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_meta, self.meta_path)
+        return len(pending)
+
+    def search(self, queries, top_k=5):
+        """Return the top-k chunks for each query.
+
+        Scores are computed block by block over the memory-mapped matrix so
+        that all queries share a single pass over the vectors.
+
+        Args:
+            queries (list[str]): Natural language queries.
+            top_k (int): Number of results per query.
+
+        Returns:
+            list[list[dict]]: One result list per query, best match first.
+        """
+        if self.vectors is None or not queries:
+            return [[] for _ in queries]
+
+        query_matrix = self._embed(list(queries))
+        total = self.vectors.shape[0]
+        k = min(top_k, total)
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+
+        for start in range(0, total, SCORE_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SCORE_BLOCK_ROWS])
+            scores = query_matrix @ block.T
+            rows = np.broadcast_to(np.arange(start, start + block.shape[0]), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            if scores.shape[1] > k:
+                keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                rows = np.take_along_axis(rows, keep, axis=1)
+            best_scores, best_rows = scores, rows
+
+        results = []
+        for scores, rows in zip(best_scores, best_rows):
+            order = np.argsort(-scores)
+            results.append([self._result(int(rows[i]), float(scores[i])) for i in order])
+        return results
+
+    def _result(self, row, score):
+        chunk = self.meta["chunks"][row]
+        try:
+            with open(os.path.join(self.root, chunk["path"]), "r", encoding="utf-8", errors="ignore") as f:
+                lines = f.readlines()[chunk["start"] - 1:chunk["end"]]
+            text = "".join(lines)
+        except OSError:
+            text = ""
+        return {
+            "path": chunk["path"],
+            "start_line": chunk["start"],
+            "end_line": chunk["end"],
+            "score": round(score, 4),
+            "text": text,
+        }
+
+
+def get_index(session):
+    """Return the (cached) semantic index for the session's workspace.
+
+    Indexes are shared by all sessions on the same workspace and model.
+    """
+    if np is None:
+        raise RuntimeError("semantic_search requires numpy. Install it with `uv pip install numpy` (or the `search` extra).")
+
+    cfg = session.model_config
+    if not cfg.get("embedding_model"):
+        raise RuntimeError(f"No embedding_model configured for provider '{cfg['provider']}'.")
+
+    key = (session.workspace, cfg["base_url"], cfg["embedding_model"])
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            from craft_code.client import create_provider_client
+            client = create_provider_client(cfg)
+            index = SemanticIndex(
+                root=session.workspace,
+                cache_dir=session.cache_dir("index"),
+                client=client,
+                model=cfg["embedding_model"],
+                settings=session.settings("semantic_search"),
+            )
+            _indexes[key] = index
+    return index
+
+
+def search(session, query, top_k=5):
+    """Refresh the session's workspace index and run a single query against it."""
+    index = get_index(session)
+    with index.lock:
+        index.refresh()
+        return index.search([query], top_k=top_k)[0]
@@ -0,0 +1,99 @@
+import os
+import threading
+from craft_code.utils import safe_path, rel_path, workspace_cache_dir
+from craft_code.pagination import ResultStore
+from craft_code.messages import MessageStore
+from craft_code.config.loader import load_config, get_active_model_config, get_section
+
+
+class Session:
+    """Per-conversation context: workspace, configuration and caches.
+
+    A session is passed through `run_agent` and `execute_tool`, so a single
+    process (TUI, batch runner, daemon) can serve several workspaces at once
+    without cross-talk.
+    """
+
+    def __init__(self, workspace: str = ".", config=None, parent=None):
+        """Initialize a session.
+
+        Args:
+            workspace: Working directory path; tools cannot leave it.
+            config: Loaded configuration, read from disk when omitted.
+            parent: Session this one was forked from; cancelling the parent
+                cancels it too.
+        """
+        self.workspace = os.path.realpath(workspace)
+        self.config = config or load_config()
+        self.model_config = get_active_model_config(cfg=self.config)
+        self.result_store = ResultStore()
+        self.message_store = MessageStore()
+        self._prefetcher = None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._parent = parent
+        # Client of the running turn, for tools that call the model
+        self.client = None
+        # Called with each output line of a running command (e.g. the TUI log panel)
+        self.on_output = None
+        # Tools offered in the last turn, the prompt tokens that saved and the cache invalidations
+        self.turn_stats = {}
+
+    def cancel(self):
+        """Ask the running agent loop to stop as soon as possible."""
+        self._cancel.set()
+
+    def reset_cancel(self):
+        """Clear a previous cancellation before starting a new turn."""
+        self._cancel.clear()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set() or (self._parent is not None and self._parent.cancelled)
+
+    def fork(self, config=None):
+        """Return a child session on the same workspace (e.g. for a sub-agent).
+
+        The child has its own message history caches and paginated results.
+
+        Args:
+            config: Configuration for the child, defaults to this session's.
+        """
+        child = Session(self.workspace, config=config or self.config, parent=self)
+        child.client = self.client
+        return child
+
+    def settings(self, name):
+        """Return a config section with defaults filled in."""
+        return get_section(name, self.config)
+
+    def safe_path(self, path: str) -> str:
+        """Resolve a path and ensure it stays inside the workspace."""
+        return safe_path(path, self.workspace)
+
+    def rel_path(self, path: str) -> str:
+        """Return the path relative to the workspace."""
+        return rel_path(path, self.workspace)
+
+    def cache_dir(self, kind: str):
+        """Return this workspace's on-disk cache directory for ``kind``."""
+        return workspace_cache_dir(kind, self.workspace)
+
+    @property
+    def prefetcher(self):
+        """The session's Prefetcher, or None when prefetching is disabled."""
+        with self._lock:
+            if self._prefetcher is None:
+                settings = self.settings("prefetch")
+                if not settings["enabled"]:
+                    return None
+                from craft_code.prefetch import Prefetcher
+                self._prefetcher = Prefetcher(max_bytes=settings["max_bytes"])
+            return self._prefetcher
+
+    def close(self):
+        """Release background resources held by the session."""
+        with self._lock:
+            if self._prefetcher is not None:
+                self._prefetcher.shutdown()
+                self._prefetcher = None
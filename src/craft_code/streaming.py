@@ -0,0 +1,287 @@
+"""Streaming completions with speculative execution of read-only tool calls.
+
+In streaming mode the response is assembled from its chunks as they arrive.
+As soon as the arguments of a tool call are complete JSON, and the call is
+cheap and read-only, it starts running on a small pool while the model
+is still emitting the rest of the message. By the time the message ends,
+those results are usually ready.
+
+A call is only started early when every call before it in the same message
+is read-only too, so a read never overtakes a write it depends on. Calls to
+tools that are not idempotent (``next_page`` consumes its cursor) are never
+started early, since a discarded result could not be fetched again. If the
+stream is cancelled or abandoned, speculative work is discarded: queued
+calls are cancelled and results of running ones are ignored.
+
+Non-streaming requests can be aborted too. Provider clients are wrapped in
+an `AbortableClient`, which serves them from a stream as well. The agent loop
+runs each request inside an `AbortScope`; aborting the scope closes the
+stream at the next chunk, which drops the HTTP connection so the server
+stops generating.
+"""
+import contextvars
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from craft_code.arguments import parse_arguments
+from craft_code.registry import get_tool
+
+# Tools too expensive to start before the model has committed to them
+SPECULATIVE_COSTS = {"low", "medium"}
+
+
+class StreamAbandoned(Exception):
+    """Raised in the streaming thread when the caller gave up on the response."""
+
+
+_current_scope = contextvars.ContextVar("craft_abort_scope", default=None)
+
+
+class AbortScope:
+    """Lets the agent loop abort the model request running in another thread.
+
+    The thread making the request enters the scope (``with scope:``); clients
+    called from it poll `aborted` between chunks and give up once it is set.
+    A scope nested in a parent (e.g. one of several hedged requests) is also
+    aborted when the parent is.
+    """
+
+    def __init__(self, parent=None):
+        self._event = threading.Event()
+        self._tokens = []
+        self._parent = parent
+
+    def abort(self):
+        """Ask the request running in this scope to stop."""
+        self._event.set()
+
+    @property
+    def aborted(self):
+        return self._event.is_set() or (self._parent is not None and self._parent.aborted)
+
+    def __enter__(self):
+        self._tokens.append(_current_scope.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        _current_scope.reset(self._tokens.pop())
+
+
+def current_scope():
+    """Return the `AbortScope` of the request running in the current context, or None."""
+    return _current_scope.get()
+
+
+def aborted():
+    """Return True if the request running in the current context was aborted."""
+    scope = _current_scope.get()
+    return scope is not None and scope.aborted
+
+
+class StreamAssembler:
+    """Rebuilds a ChatCompletion from ``ChatCompletionChunk`` objects."""
+
+    def __init__(self):
+        self.content = []
+        self.calls = []  # dicts with id, name, arguments, in index order
+        self.finish_reason = None
+        self.usage = None
+        self.model = None
+
+    def feed(self, chunk):
+        """Add a chunk. Returns the indexes of tool calls whose arguments changed."""
+        self.model = self.model or getattr(chunk, "model", None)
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage
+        changed = []
+        for choice in chunk.choices or []:
+            delta = choice.delta
+            if delta is not None and delta.content:
+                self.content.append(delta.content)
+            for call_delta in (delta.tool_calls if delta is not None else None) or []:
+                index = call_delta.index if call_delta.index is not None else len(self.calls)
+                while len(self.calls) <= index:
+                    self.calls.append({"id": None, "name": "", "arguments": ""})
+                call = self.calls[index]
+                if call_delta.id:
+                    call["id"] = call_delta.id
+                function = call_delta.function
+                if function is not None:
+                    if function.name:
+                        call["name"] += function.name
+                    if function.arguments:
+                        call["arguments"] += function.arguments
+                changed.append(index)
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+        for call in self.calls:
+            if call["id"] is None:
+                call["id"] = f"call_{uuid.uuid4().hex[:24]}"
+        return changed
+
+    def completion(self, model):
+        """Return the assembled response as a ChatCompletion."""
+        from openai.types.chat import ChatCompletion
+
+        message = {"role": "assistant", "content": "".join(self.content) or None}
+        if self.calls:
+            message["tool_calls"] = [
+                {"id": call["id"], "type": "function", "function": {"name": call["name"], "arguments": call["arguments"]}}
+                for call in self.calls
+            ]
+        data = {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": self.model or model,
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": self.finish_reason or ("tool_calls" if self.calls else "stop"),
+            }],
+        }
+        if self.usage is not None:
+            data["usage"] = self.usage.model_dump() if hasattr(self.usage, "model_dump") else self.usage
+        return ChatCompletion.model_validate(data)
+
+
+class AbortableClient:
+    """Wraps a provider client so non-streaming completions can be aborted.
+
+    A blocking request cannot be interrupted, and the server keeps generating
+    after the caller gives up. Completions are therefore always requested as
+    a stream, reassembled into a ChatCompletion, and the stream is closed as
+    soon as the surrounding `AbortScope` is aborted. Streaming requests and
+    all other attributes (embeddings, models, ...) pass through unchanged.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _create(self, **kwargs):
+        if kwargs.get("stream"):
+            return self.client.chat.completions.create(**kwargs)
+
+        assembler = StreamAssembler()
+        stream = self.client.chat.completions.create(
+            **kwargs, stream=True, stream_options={"include_usage": True}
+        )
+        try:
+            for chunk in stream:
+                if aborted():
+                    raise StreamAbandoned()
+                assembler.feed(chunk)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        return assembler.completion(kwargs.get("model"))
+
+
+class Speculator:
+    """Streams one completion and starts read-only tool calls early."""
+
+    def __init__(self, session, max_workers=4, allowed=None):
+        """Initialize the speculator.
+
+        Args:
+            session (Session): Session the tools run in.
+            max_workers (int): Maximum number of speculative calls running at once.
+            allowed (set, optional): Tools offered this turn; others are never started.
+        """
+        self.session = session
+        self.allowed = allowed
+        self.started = {}  # call id -> (arguments, future)
+        self.hits = 0
+        self._blocked = False  # a mutating call was seen: nothing after it may start
+        self._abandoned = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="craft-speculative")
+
+    def run(self, client, request):
+        """Stream the completion for ``request`` and return the assembled response.
+
+        Raises:
+            StreamAbandoned: If `abandon` was called while streaming.
+        """
+        from craft_code.tools import execute_tool
+
+        assembler = StreamAssembler()
+        stream = client.chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True}
+        )
+        try:
+            for chunk in stream:
+                if self._abandoned.is_set() or aborted():
+                    raise StreamAbandoned()
+                changed = assembler.feed(chunk)
+                for index in sorted(set(changed)):
+                    self._consider(assembler.calls, index, execute_tool)
+                    # A new call index means the previous ones are complete
+                    for earlier in range(index):
+                        self._consider(assembler.calls, earlier, execute_tool)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        for index in range(len(assembler.calls)):
+            self._consider(assembler.calls, index, execute_tool)
+        return assembler.completion(request.get("model"))
+
+    def _consider(self, calls, index, execute_tool):
+        call = calls[index]
+        if self._blocked or call["id"] in self.started or not call["name"]:
+            return
+        for earlier in calls[:index]:
+            entry = get_tool(earlier["name"])
+            if entry is None or not entry.read_only:
+                self._blocked = True
+                return
+        entry = get_tool(call["name"])
+        if entry is None or not entry.read_only or not entry.idempotent or entry.cost not in SPECULATIVE_COSTS:
+            if entry is not None and not entry.read_only:
+                self._blocked = True
+            return
+        if self.allowed is not None and call["name"] not in self.allowed:
+            return
+        try:
+            # Only strictly complete JSON: repairing would accept a truncated prefix
+            if not isinstance(json.loads(call["arguments"]), dict):
+                return
+        except ValueError:
+            return
+        args, error = parse_arguments(call["name"], call["arguments"], entry.parameters)
+        if error is not None:
+            return
+        future = self._pool.submit(execute_tool, call["name"], args, self.session)
+        self.started[call["id"]] = (call["arguments"], future)
+
+    def take(self, tool_call):
+        """Return the future of a speculatively started call, or None.
+
+        The result is only reused if the final arguments are the ones it
+        was started with.
+        """
+        started = self.started.pop(tool_call.id, None)
+        if started is None or started[0] != tool_call.function.arguments:
+            return None
+        self.hits += 1
+        return started[1]
+
+    def abandon(self):
+        """Stop streaming and discard all speculative work."""
+        self._abandoned.set()
+        self.started.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """Release the worker pool once the step is over."""
+        self.started.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,95 +1,40 @@
 import os
 import re
-from craft_code.utils import safe_path
-
-# Tool definitions
-tools = [
-    {
-        "type": "function",
-        "function": {
-            "name": "list_directory",
-            "description": "List files in a directory.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string", "description": "Path to directory"},
-                },
-                "required": ["path"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "read_file",
-            "description": "Read the contents of a text file (max 20KB).",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string", "description": "Path to the file"},
-                },
-                "required": ["path"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "search_in_file",
-            "description": "Search for a keyword or regex pattern in a file and return matching lines.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string", "description": "Path to the file"},
-                    "pattern": {"type": "string", "description": "Regex or keyword to search for"},
-                },
-                "required": ["path", "pattern"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "write_file",
-            "description": "Write or overwrite content to a file.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string", "description": "Path to the file"},
-                    "content": {"type": "string", "description": "Text content to write"},
-                },
-                "required": ["path", "content"],
-            },
-        },
-    },
-]
-
-def list_directory(path):
-    """List files in the given directory.
-    
+from craft_code.search import search_file
+from craft_code.registry import get_tool, tool, tool_schemas
+
+
+@tool(read_only=True, cost="low")
+def list_directory(path: str, session):
+    """List files in a directory.
+
     Args:
         path (str): Path to the directory.
+        session (Session): Current session.
 
     Returns:
         list: List of files in the directory.
     """
     try:
-        safe_dir = safe_path(path)
+        safe_dir = session.safe_path(path)
         return os.listdir(safe_dir)
     except Exception as e:
         return {"error": str(e)}
-    
-def read_file(path):
-    """Read the contents of a text file safely (max 20KB).
-    
+
+
+@tool(read_only=True, cost="low")
+def read_file(path: str, session):
+    """Read the contents of a text file (max 20KB).
+
     Args:
         path (str): Path to the file.
+        session (Session): Current session.
 
     Returns:
         str: Contents of the file.
     """
     try:
-        safe_file = safe_path(path)
+        safe_file = session.safe_path(path)
         if not os.path.isfile(safe_file):
             return {"error": f"{path} is not a file."}
 
@@ -99,52 +44,83 @@ def read_file(path):
         if size > max_size:
             return {"error": f"File too large ({size} bytes). Max allowed: {max_size}."}
 
+        prefetcher = session.prefetcher
+        if prefetcher is not None:
+            content = prefetcher.get(safe_file)
+            if content is not None:
+                return {"content": content}
+
         with open(safe_file, "r", encoding="utf-8", errors="ignore") as f:
             return {"content": f.read()}
     except Exception as e:
         return {"error": str(e)}
 
 
-def search_in_file(path, pattern):
-    """Search for a regex or keyword inside a file and return matching lines.
-    
+@tool(read_only=True, cost="medium")
+def search_in_file(
+    path: str,
+    pattern: str,
+    session,
+    patterns: list[str] | None = None,
+    before: int = 0,
+    after: int = 0,
+    case_sensitive: bool = False,
+    max_matches: int = 200,
+):
+    """Search for a keyword or regex pattern in a file and return matching lines, optionally with surrounding context.
+
+    The file is memory-mapped and scanned with compiled bytes regexes, so
+    large files are searched without being decoded line by line. Matching
+    is ASCII-only: \\w, \\b and case folding do not cover non-ASCII letters.
+
     Args:
         path (str): Path to the file.
         pattern (str): Regex pattern or keyword to search for.
-        
+        session (Session): Current session.
+        patterns (list[str], optional): Additional patterns; lines matching any pattern are returned.
+        before (int): Context lines to include before each match.
+        after (int): Context lines to include after each match.
+        case_sensitive (bool): Match case exactly.
+        max_matches (int): Stop after this many matching lines.
+
     Returns:
         dict: Matches found with line numbers.
     """
+    all_patterns = [pattern] + list(patterns or [])
     try:
-        safe_file = safe_path(path)
+        safe_file = session.safe_path(path)
         if not os.path.isfile(safe_file):
             return {"error": f"{path} is not a file."}
 
-        results = []
-        regex = re.compile(pattern, re.IGNORECASE)
-        with open(safe_file, "r", encoding="utf-8", errors="ignore") as f:
-            for i, line in enumerate(f, start=1):
-                if regex.search(line):
-                    results.append({"line": i, "text": line.strip()})
-        return {"matches": results, "count": len(results)}
+        results, truncated = search_file(
+            safe_file,
+            all_patterns,
+            before=max(0, int(before)),
+            after=max(0, int(after)),
+            case_sensitive=bool(case_sensitive),
+            max_matches=max(1, int(max_matches)),
+        )
+        return {"matches": results, "count": len(results), "truncated": truncated}
     except re.error:
-        return {"error": f"Invalid regex pattern: {pattern}"}
+        return {"error": f"Invalid regex pattern: {' | '.join(all_patterns)}"}
     except Exception as e:
         return {"error": str(e)}
 
 
-def write_file(path, content):
-    """Write or overwrite a file with new content.
+@tool(read_only=False, cost="low")
+def write_file(path: str, content: str, session):
+    """Write or overwrite content to a file.
 
     Args:
         path (str): Path to the file.
         content (str): Text content to write.
+        session (Session): Current session.
 
     Returns:
         dict: Success message or error details.
     """
     try:
-        safe_file = safe_path(path)
+        safe_file = session.safe_path(path)
         os.makedirs(os.path.dirname(safe_file), exist_ok=True)
         with open(safe_file, "w", encoding="utf-8") as f:
             f.write(content)
@@ -153,23 +129,169 @@ def write_file(path, content):
         return {"error": str(e)}
 
 
-def execute_tool(tool_name, args):
+@tool(read_only=False, cost="high")
+def run_command(command: str, session, timeout: int = 0):
+    """Run an allowlisted command (tests, linters, git status/diff) in the workspace and return a summary of its output.
+
+    No shell is used: pipes, redirections and variables are not supported.
+
+    Args:
+        command (str): Command line, e.g. 'pytest -x tests/test_api.py'.
+        session (Session): Current session.
+        timeout (int): Time limit in seconds (default and maximum: the configured limit).
+
+    Returns:
+        dict: Exit code, duration and a head/tail summary of stdout/stderr.
+    """
+    from craft_code import commands
+
+    settings = session.settings("commands")
+    if not settings["enabled"]:
+        return {"error": "run_command is disabled in the configuration."}
+    try:
+        argv = commands.split_command(command)
+    except ValueError as e:
+        return {"error": f"Invalid command: {e}"}
+    if not commands.is_allowed(argv, settings["allowed"]):
+        return {"error": f"Command not allowed: {argv[0]}. Allowed commands: {', '.join(settings['allowed'])}."}
+    problem = commands.check_arguments(argv, session.workspace)
+    if problem:
+        return {"error": f"Command not allowed: {problem}."}
+
+    limit = settings["timeout"]
+    if timeout and int(timeout) > 0:
+        limit = min(int(timeout), limit) if limit else int(timeout)
+    try:
+        result = commands.run_command(
+            argv,
+            cwd=session.workspace,
+            timeout=limit,
+            cpu_seconds=settings["cpu_seconds"],
+            max_memory_mb=settings["max_memory_mb"],
+            max_output_chars=settings["max_output_chars"],
+            on_output=session.on_output,
+            cancelled=lambda: session.cancelled,
+        )
+    except OSError as e:
+        return {"error": f"Could not run {argv[0]}: {e}"}
+    return {"command": command, **result}
+
+
+@tool(read_only=True, cost="high")
+def semantic_search(query: str, session, top_k: int = 5):
+    """Search the codebase by meaning (e.g. 'where do we handle retries') and return the most relevant code chunks.
+
+    The embedding index is only imported and loaded on the first call.
+
+    Args:
+        query (str): Natural language description of the code to find.
+        session (Session): Current session.
+        top_k (int): Number of chunks to return.
+
+    Returns:
+        dict: Ranked chunks with path, line range, score and text.
+    """
+    try:
+        from craft_code.semantic import search
+        return {"results": search(session, query, top_k=max(1, int(top_k)))}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@tool(read_only=True, cost="high")
+def delegate(tasks: list[str], session):
+    """Run independent subtasks in parallel sub-agents with read-only tools and return their condensed answers.
+
+    Use it for questions spanning many files or modules, e.g. one subtask per
+    module. Each subtask must be self-contained: sub-agents do not see this
+    conversation.
+
+    Args:
+        tasks (list[str]): Self-contained subtasks, e.g. 'Summarize how src/api/ uses the config'.
+        session (Session): Current session.
+
+    Returns:
+        dict: One result per subtask, in order.
+    """
+    if session.client is None:
+        return {"error": "delegate is only available inside an agent turn."}
+    if not tasks:
+        return {"error": "No subtasks given."}
+
+    from craft_code.delegate import run_subtasks
+
+    max_tasks = session.settings("delegate")["max_tasks"]
+    output = {"results": run_subtasks(session, tasks)}
+    if len(tasks) > max_tasks:
+        output["skipped"] = f"Only the first {max_tasks} subtasks were run."
+    return output
+
+
+# Not idempotent: the cursor is dropped after the last page
+@tool(read_only=True, cost="low", idempotent=False)
+def next_page(cursor: str, session):
+    """Fetch the next page of a large tool result using the cursor it returned.
+
+    Args:
+        cursor (str): The next_cursor value from the previous page.
+        session (Session): Current session.
+
+    Returns:
+        dict: The requested page, or error details.
+    """
+    return session.result_store.next_page(cursor)
+
+
+def paginate(tool_name, output, session):
+    """Bound a tool output to its configured page size.
+
+    Args:
+        tool_name (str): Name of the tool that produced the output.
+        output: Raw tool output.
+        session (Session): Session whose result store keeps the remaining pages.
+
+    Returns:
+        The output, or its first page with a ``next_cursor``.
+    """
+    settings = session.settings("pagination")
+    if not settings["enabled"] or tool_name == "next_page":
+        return output
+    session.result_store.max_page_chars = settings["max_page_chars"]
+    page_size = settings["page_sizes"].get(tool_name, settings["default_page_size"])
+    return session.result_store.paginate(tool_name, output, page_size)
+
+
+def execute_tool(tool_name, args, session):
     """Route tool calls to the correct Python function with sandbox enforcement.
+
+    Large results are paginated (see `paginate`). After a file is read or
+    searched, its likely follow-up files are prefetched in the background.
+
     Args:
         tool_name (str): Name of the tool to execute.
         args (dict): Arguments for the tool.
+        session (Session): Session providing the workspace and caches.
     """
+    output = _dispatch(tool_name, args, session)
+
+    if tool_name in {"read_file", "search_in_file"} and not (isinstance(output, dict) and "error" in output):
+        prefetcher = session.prefetcher
+        if prefetcher is not None:
+            prefetcher.schedule(session.safe_path(args["path"]), session.workspace)
+
+    return paginate(tool_name, output, session)
+
+
+def _dispatch(tool_name, args, session):
+    entry = get_tool(tool_name)
+    if entry is None:
+        return {"error": f"Unknown tool '{tool_name}'"}
     try:
-        if tool_name == "list_directory":
-            return list_directory(**args)
-        elif tool_name == "read_file":
-            return read_file(**args)
-        elif tool_name == "search_in_file":
-            return search_in_file(**args)
-        elif tool_name == "write_file":
-            return write_file(**args)
-        else:
-            return {"error": f"Unknown tool '{tool_name}'"}
+        return entry.func(**args, session=session)
     except ValueError as e:
         # Catch sandbox violations
         return {"error": str(e)}
+
+
+# Schemas of all registered tools, in the order the model sees them
+tools = tool_schemas()
@@ -0,0 +1,120 @@
+"""Per-conversation selection of the tool schemas sent to the model.
+
+Every request repeats the tool schemas, and local models without prefix
+caching re-process them on every step. Instead of offering every tool, the
+agent offers the tools relevant to the conversation so far: the read-only
+core tools always, write and command tools once a request asks for changes
+or checks, ``delegate`` once a question is repository-wide, and every tool
+the model has called.
+
+Chat templates render the tools ahead of the conversation, so changing them
+invalidates the server's prefix cache for the whole history. The offered
+list therefore only grows within a conversation: it is the union of what
+every user message so far called for, in the order tools were first
+offered, so new tools are appended and nothing is ever dropped. A call to an
+available tool that was not offered still runs; the tool is appended for the
+rest of the conversation. Each change after the first request is reported as
+a cache invalidation.
+"""
+import importlib.util
+import json
+import re
+
+from craft_code.registry import REGISTRY
+
+# Offered from the first turn, first and in this order
+CORE_TOOLS = ("list_directory", "read_file", "search_in_file")
+
+EDIT_INTENT = re.compile(
+    r"\b(write|create|add|fix|implement|change|update|modify|refactor|rename|delete|remove|edit|replace|"
+    r"generate|save|patch|convert|move|make)\b",
+    re.IGNORECASE,
+)
+RUN_INTENT = re.compile(
+    r"\b(tests?|pytest|run|lint|linter|ruff|mypy|build|compile|check|diff|status|git)\b",
+    re.IGNORECASE,
+)
+REPO_WIDE = re.compile(
+    r"\b(every|all|each|whole|entire|across|overall|architecture|codebase|repository|repo|modules|project)\b",
+    re.IGNORECASE,
+)
+
+# Rough size of a token in characters, for reporting savings
+CHARS_PER_TOKEN = 4
+
+
+def detect_phase(text):
+    """Return ``"edit"`` if a user request asks for changes, else ``"qa"``."""
+    return "edit" if EDIT_INTENT.search(text) else "qa"
+
+
+def _semantic_available(session):
+    return bool(session.model_config.get("embedding_model")) and importlib.util.find_spec("numpy") is not None
+
+
+def request_tools(text, session):
+    """Return the tools a single user request calls for.
+
+    Args:
+        text (str): Content of the user message.
+        session (Session): Current session.
+
+    Returns:
+        list[str]: Tool names, core tools first, then in registration order.
+    """
+    selected = set(CORE_TOOLS)
+    edit = detect_phase(text) == "edit"
+    if edit:
+        selected.add("write_file")
+    if (edit or RUN_INTENT.search(text)) and session.settings("commands")["enabled"]:
+        selected.add("run_command")
+    if _semantic_available(session):
+        selected.add("semantic_search")
+    if REPO_WIDE.search(text):
+        selected.add("delegate")
+    if session.settings("pagination")["enabled"]:
+        selected.add("next_page")
+    position = {name: index for index, name in enumerate(REGISTRY)}
+    return sorted(selected, key=lambda name: (name not in CORE_TOOLS, position.get(name, len(position))))
+
+
+def select_tools(messages, available, session):
+    """Return the tools to offer for a conversation.
+
+    Args:
+        messages (list): Conversation so far.
+        available (Iterable[str]): Tools that may be offered at all.
+        session (Session): Current session.
+
+    Returns:
+        list[str]: Tool names in the order they were first offered.
+    """
+    available = set(available)
+    offered = []
+    for message in messages:
+        if not isinstance(message, dict):
+            continue
+        if message.get("role") == "user":
+            names = request_tools(str(message.get("content") or ""), session)
+        elif message.get("role") == "assistant":
+            names = [call["function"]["name"] for call in message.get("tool_calls") or []]
+        else:
+            continue
+        offered.extend(name for name in names if name in available and name not in offered)
+    return offered
+
+
+def previous_tools(messages, available, session):
+    """Return the tools offered at the end of the previous turn."""
+    last_user = max((i for i, m in enumerate(messages) if isinstance(m, dict) and m.get("role") == "user"), default=0)
+    return select_tools(messages[:last_user], available, session)
+
+
+def schema_tokens(names):
+    """Estimate the prompt tokens taken by the schemas of ``names``."""
+    return sum(len(json.dumps(REGISTRY[name].schema())) for name in names if name in REGISTRY) // CHARS_PER_TOKEN
+
+
+def history_tokens(messages):
+    """Estimate the prompt tokens of a conversation (re-processed after an invalidation)."""
+    return len(json.dumps(messages, default=str)) // CHARS_PER_TOKEN
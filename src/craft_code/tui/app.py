@@ -1,14 +1,15 @@
+from collections import deque
+
 from textual.app import App, ComposeResult
 from textual.containers import Container, Vertical
 from textual.widgets import Input
 from textual.binding import Binding
 
-from craft_code.config.loader import get_active_model_config
-from craft_code.utils import set_base_dir, BASE_DIR
+from craft_code.session import Session
 from craft_code.tui.widgets import ChatHistory, StatusLine, LogPanel
 from craft_code.core import run_agent
-from craft_code.config.prompts import SYSTEM_PROMPT
-from openai import OpenAI
+from craft_code.config.prompts import SYSTEM_PROMPT, build_system_prompt
+from craft_code.client import create_client
 
 
 class CraftCodeApp(App):
@@ -104,6 +105,7 @@ class CraftCodeApp(App):
 
     BINDINGS = [
         Binding("ctrl+c", "quit", "Quit", priority=True),
+        Binding("escape", "cancel", "Cancel", show=True),
         Binding("ctrl+l", "toggle_logs", "Logs", show=True),
         Binding("ctrl+r", "clear_chat", "Clear", show=True),
     ]
@@ -116,9 +118,12 @@ class CraftCodeApp(App):
         """
         super().__init__()
         self.workspace = workspace
-        self.messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        self.session = None
+        self.system_prompt = SYSTEM_PROMPT
+        self.messages = [{"role": "system", "content": self.system_prompt}]
         self.client = None
         self.is_processing = False
+        self.pending_inputs = deque()
 
     def compose(self) -> ComposeResult:
         """Compose the TUI layout."""
@@ -135,13 +140,15 @@ class CraftCodeApp(App):
 
     def on_mount(self) -> None:
         """Initialize the application on mount."""
-        set_base_dir(self.workspace)
+        self.session = Session(self.workspace)
+        self.system_prompt = build_system_prompt(self.session)
+        self.messages = [{"role": "system", "content": self.system_prompt}]
         
-        cfg = get_active_model_config()
-        self.client = OpenAI(base_url=cfg["base_url"], api_key=cfg["api_key"])
+        cfg = self.session.model_config
+        self.client = create_client(cfg)
         
         statusline = self.query_one("#statusline", StatusLine)
-        statusline.update_config(cfg, BASE_DIR)
+        statusline.update_config(cfg, self.session.workspace)
         
         chat = self.query_one("#chat-container", ChatHistory)
         chat.add_system_message("Craft Code started. Type /help for commands.")
@@ -151,12 +158,12 @@ class CraftCodeApp(App):
     async def on_input_submitted(self, event: Input.Submitted) -> None:
         """Handle user input submission.
         
+        Messages typed while a turn is running are queued and sent once it
+        finishes.
+        
         Args:
             event: Input submission event
         """
-        if self.is_processing:
-            return
-            
         user_input = event.value.strip()
         if not user_input:
             return
@@ -168,19 +175,32 @@ class CraftCodeApp(App):
             await self.handle_command(user_input)
             return
         
-        # Process message
-        chat = self.query_one("#chat-container", ChatHistory)
-        chat.add_user_message(user_input)
-        
-        self.messages.append({"role": "user", "content": user_input})
+        if self.is_processing:
+            self.pending_inputs.append(user_input)
+            chat = self.query_one("#chat-container", ChatHistory)
+            chat.add_system_message(f"Queued: {user_input}")
+            return
         
+        # Process messages in a worker so Esc and typed-ahead input stay responsive
         self.is_processing = True
+        self.run_worker(self.process_inputs(user_input), group="agent")
+
+    async def process_inputs(self, user_input: str) -> None:
+        """Run a turn for the input, then for every queued input.
+        
+        Args:
+            user_input: First message to send
+        """
+        chat = self.query_one("#chat-container", ChatHistory)
         statusline = self.query_one("#statusline", StatusLine)
         statusline.set_processing(True)
         
         try:
-            # Run agent in background
-            await self.run_agent_async()
+            while user_input is not None:
+                chat.add_user_message(user_input)
+                self.messages.append({"role": "user", "content": user_input})
+                await self.run_agent_async()
+                user_input = self.pending_inputs.popleft() if self.pending_inputs else None
         finally:
             self.is_processing = False
             statusline.set_processing(False)
@@ -193,6 +213,12 @@ class CraftCodeApp(App):
         # Define callback to handle messages from agent
         def message_callback(msg: dict) -> None:
             self.call_from_thread(self.handle_agent_message, msg, chat, log_panel)
+
+        # Stream run_command output to the log panel
+        def output_callback(line: str) -> None:
+            self.call_from_thread(log_panel.add_log, f"$ {line}")
+
+        self.session.on_output = output_callback
         
         # Define worker function that captures the arguments
         def worker_func():
@@ -200,12 +226,19 @@ class CraftCodeApp(App):
                 messages=self.messages,
                 client=self.client,
                 verbose=False,
-                callback=message_callback
+                callback=message_callback,
+                session=self.session,
             )
         
         # Run agent in worker thread
         worker = self.run_worker(worker_func, thread=True)
         self.messages = await worker.wait()
+        stats = self.session.turn_stats
+        if stats.get("tools"):
+            log_panel.add_log(
+                f"Tools offered: {', '.join(stats['tools'])} (~{stats['prompt_tokens_saved']} prompt tokens saved, "
+                f"{stats['cache_invalidations']} cache invalidation(s), ~{stats['invalidated_tokens']} tokens re-processed)"
+            )
 
     def handle_agent_message(self, message: dict, chat: ChatHistory, log_panel: LogPanel) -> None:
         """Handle messages from the agent.
@@ -220,6 +253,9 @@ class CraftCodeApp(App):
             if content:
                 chat.add_assistant_message(content)
         
+        elif message.get("role") == "system":
+            chat.add_system_message(message.get("content", ""))
+        
         elif message.get("role") == "tool":
             tool_name = message.get("tool_name", "unknown")
             content = message.get("content", "")
@@ -250,6 +286,7 @@ class CraftCodeApp(App):
             /logs         Toggle log panel
 
             Keyboard shortcuts:
+            Esc           Cancel the running turn
             Ctrl+C        Quit
             Ctrl+L        Toggle logs
             Ctrl+R        Clear chat"""
@@ -264,13 +301,27 @@ class CraftCodeApp(App):
         log_panel = self.query_one("#log-panel", LogPanel)
         log_panel.toggle_class("visible")
 
+    def action_cancel(self) -> None:
+        """Cancel the running turn and drop queued messages."""
+        if not self.is_processing:
+            return
+        self.pending_inputs.clear()
+        self.session.cancel()
+        chat = self.query_one("#chat-container", ChatHistory)
+        chat.add_system_message("Cancelling...")
+
     def action_clear_chat(self) -> None:
         """Clear the chat history."""
         chat = self.query_one("#chat-container", ChatHistory)
+        if self.is_processing:
+            chat.add_system_message("A turn is running. Press Esc to cancel it first.")
+            return
         chat.clear()
-        self.messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        self.messages = [{"role": "system", "content": self.system_prompt}]
         chat.add_system_message("Chat history cleared.")
 
     def action_quit(self) -> None:
         """Quit the application."""
+        if self.session is not None:
+            self.session.close()
         self.exit()
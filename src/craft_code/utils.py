@@ -1,8 +1,13 @@
 from datetime import datetime
+import hashlib
 import json
 import os
 
-BASE_DIR = os.getcwd()
+# Directories never worth indexing or walking
+IGNORED_DIRS = {
+    ".git", ".hg", ".svn", ".venv", "venv", "node_modules", "__pycache__",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".nox", "dist", "build",
+}
 
 def debug_log(title, data=None):
     """Pretty-print debugging information safely.
@@ -28,37 +33,93 @@ def debug_log(title, data=None):
     print()
 
 
-def safe_path(path: str) -> str:
+def to_jsonable(value):
+    """Convert pydantic models (e.g. ChatCompletionMessage) to plain JSON data."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    return value
+
+
+def safe_path(path: str, base_dir: str) -> str:
     """
-    Resolve a path and ensure it stays inside BASE_DIR.
+    Resolve a path and ensure it stays inside base_dir.
     
     Args:
         path (str): User-supplied path (absolute or relative)
+        base_dir (str): Absolute workspace directory
     
     Returns:
         str: Absolute safe path
     
     Raises:
-        ValueError: If the path escapes BASE_DIR
+        ValueError: If the path escapes base_dir
     """
     # Resolve relative paths and symbolic links
-    full_path = os.path.realpath(os.path.join(BASE_DIR, path))
+    full_path = os.path.realpath(os.path.join(base_dir, path))
 
-    # Check if resolved path is inside BASE_DIR
-    if not full_path.startswith(BASE_DIR):
+    # Check if resolved path is inside the workspace
+    if full_path != base_dir and not full_path.startswith(base_dir + os.sep):
         raise ValueError(
-            f"Access denied: '{full_path}' is outside the allowed working directory ({BASE_DIR})."
+            f"Access denied: '{full_path}' is outside the allowed working directory ({base_dir})."
         )
 
     return full_path
 
-def rel_path(path: str) -> str:
-    """Return the path relative to BASE_DIR."""
-    from .utils import BASE_DIR
-    return os.path.relpath(path, BASE_DIR)
+def rel_path(path: str, base_dir: str) -> str:
+    """Return the path relative to base_dir."""
+    return os.path.relpath(path, base_dir)
+
+def iter_workspace_files(base_dir: str, max_size=None):
+    """Yield absolute paths of files inside base_dir.
 
-def set_base_dir(path: str):
-    """Set the base working directory for Craft Code."""
-    global BASE_DIR
-    BASE_DIR = os.path.realpath(path)
-    print(f"📁 Workspace set to: {BASE_DIR}")
+    Hidden and vendored directories (see IGNORED_DIRS) are skipped.
+    Symlinked directories are not followed (``followlinks=False``), and
+    symlinked files are skipped unless they resolve inside base_dir, as
+    `safe_path` requires.
+
+    Args:
+        base_dir (str): Workspace directory to walk.
+        max_size (int, optional): Skip files larger than this many bytes.
+    """
+    base_dir = os.path.realpath(base_dir)
+    for root, dirs, files in os.walk(base_dir, followlinks=False):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS and not d.startswith("."))
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                try:
+                    safe_path(os.path.realpath(path), base_dir)
+                except ValueError:
+                    continue
+            if max_size is not None:
+                try:
+                    if os.path.getsize(path) > max_size:
+                        continue
+                except OSError:
+                    continue
+            yield path
+
+def is_binary_file(path: str) -> bool:
+    """Return True if the file looks binary (contains a NUL byte near the start)."""
+    try:
+        with open(path, "rb") as f:
+            return b"\0" in f.read(1024)
+    except OSError:
+        return True
+
+def workspace_cache_dir(kind: str, base_dir: str):
+    """Return (and create) a per-workspace cache directory under CACHE_DIR.
+
+    Args:
+        kind (str): Cache name, e.g. "index" or "repomap".
+        base_dir (str): Workspace the cache belongs to.
+    """
+    from craft_code.config.loader import CACHE_DIR
+    key = hashlib.sha1(base_dir.encode("utf-8")).hexdigest()[:16]
+    path = CACHE_DIR / kind / key
+    path.mkdir(parents=True, exist_ok=True)
+    return path
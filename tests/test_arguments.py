@@ -0,0 +1,175 @@
+import json
+
+import pytest
+
+from craft_code.arguments import (
+    TruncatedArguments,
+    _coerce,
+    loads,
+    parse_arguments,
+    repair_json,
+    strict_schema,
+    validate,
+)
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ('{"path": "src"}', {"path": "src"}),
+        ('{"path": "src",}', {"path": "src"}),
+        ("{'path': 'src'}", {"path": "src"}),
+        ("{'path': 'src',}", {"path": "src"}),
+        ('```json\n{"path": "a.py"}\n```', {"path": "a.py"}),
+        ('Sure: {"path": "a.py"}', {"path": "a.py"}),
+        ('{"a": True, "b": None, "c": False}', {"a": True, "b": None, "c": False}),
+        ('{"name": "Trueish"}', {"name": "Trueish"}),
+        ('{"pattern": "\\d+\\s"}', {"pattern": "\\d+\\s"}),
+        ('{"content": "line1\nline2\ttab"}', {"content": "line1\nline2\ttab"}),
+        ("{'text': 'it\\'s'}", {"text": "it's"}),
+        ("{'text': 'say \"hi\"'}", {"text": 'say "hi"'}),
+        ('{"items": [1, 2, 3,],}', {"items": [1, 2, 3]}),
+        ('{"path": "src', {"path": "src"}),
+        ('{"path": "src", "max', {"path": "src"}),
+        ('{"path": "src", "max":', {"path": "src"}),
+        ('{"paths": ["a", "b"', {"paths": ["a", "b"]}),
+        ('{"nested": {"a": [1, {"b": 2', {"nested": {"a": [1, {"b": 2}]}}),
+        ('{"path": "a\\', {"path": "a"}),
+    ],
+)
+def test_repair_json(raw, expected):
+    assert json.loads(repair_json(raw)) == expected
+
+
+def test_loads_reports_repairs():
+    assert loads('{"a": 1}') == ({"a": 1}, False)
+    assert loads("{'a': 1}") == ({"a": 1}, True)
+    assert loads("") == ({}, False)
+    assert loads(None) == ({}, False)
+    assert loads({"a": 1}) == ({"a": 1}, False)
+
+
+def test_loads_double_encoded():
+    assert loads(json.dumps('{"path": "src"}')) == ({"path": "src"}, True)
+
+
+def test_loads_refuses_truncation_when_not_allowed():
+    with pytest.raises(TruncatedArguments):
+        loads('{"path": "a.py", "content": "def f():\\n    ret', allow_truncated=False)
+    # Repairs that do not complete truncated input are still accepted
+    assert loads("{'path': 'src',}", allow_truncated=False) == ({"path": "src"}, True)
+
+
+def test_loads_invalid():
+    with pytest.raises(ValueError):
+        loads("not json at all")
+
+
+@pytest.mark.parametrize(
+    "value, schema, expected",
+    [
+        ("5", {"type": "integer"}, 5),
+        (5.0, {"type": "integer"}, 5),
+        (" -3 ", {"type": "integer"}, -3),
+        ("2.5", {"type": "number"}, 2.5),
+        (7, {"type": "number"}, 7),
+        (3, {"type": "string"}, "3"),
+        ("true", {"type": "boolean"}, True),
+        ("No", {"type": "boolean"}, False),
+        (1, {"type": "boolean"}, True),
+        ("a", {"type": "array", "items": {"type": "string"}}, ["a"]),
+        ('["1", "2"]', {"type": "array", "items": {"type": "integer"}}, [1, 2]),
+        ('{"a": 1}', {"type": "object"}, {"a": 1}),
+        (None, {"type": ["string", "null"]}, None),
+        ("x", {"type": ["string", "null"]}, "x"),
+        ({"any": 1}, {}, {"any": 1}),
+    ],
+)
+def test_coerce(value, schema, expected):
+    assert _coerce(value, schema) == expected
+
+
+@pytest.mark.parametrize(
+    "value, schema",
+    [
+        ("five", {"type": "integer"}),
+        (2.5, {"type": "integer"}),
+        (True, {"type": "integer"}),
+        (True, {"type": "string"}),
+        ("maybe", {"type": "boolean"}),
+        ("abc", {"type": "number"}),
+        ("not an object", {"type": "object"}),
+        (["x"], {"type": "array", "items": {"type": "integer"}}),
+    ],
+)
+def test_coerce_rejects(value, schema):
+    with pytest.raises(ValueError):
+        _coerce(value, schema)
+
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "path": {"type": "string"},
+        "max_lines": {"type": "integer"},
+        "recursive": {"type": "boolean"},
+    },
+    "required": ["path"],
+}
+
+
+def test_validate_coerces_and_drops():
+    args, problems = validate({"path": "a", "max_lines": "10", "recursive": None, "extra": 1}, SCHEMA)
+    assert args == {"path": "a", "max_lines": 10}
+    assert problems == {}
+
+
+def test_validate_reports_problems():
+    args, problems = validate({"max_lines": "many"}, SCHEMA)
+    assert args == {}
+    assert problems == {"max_lines": "expected integer, got str", "path": "missing required argument"}
+
+
+def test_validate_required_null():
+    _, problems = validate({"path": None}, SCHEMA)
+    assert problems == {"path": "missing required argument"}
+
+
+def test_parse_arguments_ok():
+    assert parse_arguments("read_file", "{'path': 'a.py', 'max_lines': '5',}", SCHEMA) == (
+        {"path": "a.py", "max_lines": 5},
+        None,
+    )
+
+
+def test_parse_arguments_error_lists_expected():
+    args, error = parse_arguments("read_file", '{"max_lines": 5}', SCHEMA)
+    assert args is None
+    assert "path: missing required argument" in error["error"]
+    assert error["expected"] == {"path": "string (required)", "max_lines": "integer", "recursive": "boolean"}
+
+
+def test_parse_arguments_not_an_object():
+    args, error = parse_arguments("read_file", "[1, 2]", SCHEMA)
+    assert args is None
+    assert "must be a JSON object" in error["error"]
+
+
+def test_parse_arguments_truncated_mutating_call():
+    raw = '{"path": "a.py", "content": "def f():\\n    ret'
+    assert parse_arguments("write_file", raw)[0] == {"path": "a.py", "content": "def f():\n    ret"}
+    args, error = parse_arguments("write_file", raw, allow_truncated=False)
+    assert args is None
+    assert "truncated" in error["error"]
+
+
+def test_strict_schema():
+    tool = {"type": "function", "function": {"name": "read_file", "description": "Read.", "parameters": SCHEMA}}
+    function = strict_schema(tool)["function"]
+    assert function["strict"] is True
+    assert function["parameters"]["required"] == ["path", "max_lines", "recursive"]
+    assert function["parameters"]["additionalProperties"] is False
+    assert function["parameters"]["properties"]["path"] == {"type": "string"}
+    assert function["parameters"]["properties"]["max_lines"] == {"type": ["integer", "null"]}
+    # The original schema is left untouched
+    assert SCHEMA["properties"]["max_lines"] == {"type": "integer"}
@@ -0,0 +1,63 @@
+import copy
+from types import SimpleNamespace as NS
+
+import pytest
+
+pytest.importorskip("openai")
+
+from craft_code import tools  # noqa: E402,F401 (registers the tools)
+from craft_code.cascade import CascadeClient  # noqa: E402
+from craft_code.config.loader import DEFAULT_CONFIG  # noqa: E402
+from craft_code.core import run_agent  # noqa: E402
+from craft_code.session import Session  # noqa: E402
+from craft_code.streaming import AbortableClient  # noqa: E402
+
+
+def _chunk(content=None, call=None, finish_reason=None):
+    calls = None
+    if call is not None:
+        name, arguments = call
+        calls = [NS(index=0, id="call_1", function=NS(name=name, arguments=arguments))]
+    return NS(model="m", usage=None, choices=[NS(delta=NS(content=content, tool_calls=calls), finish_reason=finish_reason)])
+
+
+class Provider:
+    """Stand-in server: streams ``script[step]``, where step counts assistant messages."""
+
+    def __init__(self, calls, script):
+        self.calls = calls
+        self.script = script
+        self.chat = NS(completions=NS(create=self._create))
+
+    def _create(self, **kwargs):
+        step = sum(1 for m in kwargs["messages"] if m.get("role") == "assistant")
+        self.calls.append((kwargs["model"], step))
+        return iter(self.script[min(step, len(self.script) - 1)])
+
+
+LIST = [_chunk(call=("list_directory", '{"path": "."}')), _chunk(finish_reason="tool_calls")]
+WRITE = [_chunk(call=("write_file", '{"path": "a.py", "content": "x = 2"}')), _chunk(finish_reason="tool_calls")]
+ANSWER = [_chunk(content="Done."), _chunk(finish_reason="stop")]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_fast_model_keeps_read_only_steps(stream, tmp_path):
+    (tmp_path / "a.py").write_text("x = 1\n")
+    calls = []
+    fast = Provider(calls, [LIST, WRITE, ANSWER])
+    strong = Provider(calls, [LIST, WRITE, ANSWER])
+    client = CascadeClient(AbortableClient(fast), "fast", AbortableClient(strong), "strong")
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    config["agent"]["stream"] = stream
+    session = Session(str(tmp_path), config=config)
+    messages = [{"role": "user", "content": "Set x to 2 in a.py"}]
+
+    run_agent(messages, client, session=session, callback=lambda message: None)
+
+    # Step 0: the fast model's list_directory is kept. Step 1: its write_file is
+    # escalated. Step 2: the fast model's answer is escalated.
+    assert calls == [("fast", 0), ("fast", 1), ("strong", 1), ("fast", 2), ("strong", 2)]
+    assert client.stats == {"fast": 3, "strong": 2, "escalations": 2}
+    assert client.last_escalation == "final answer"
+    assert messages[-1] == {"role": "assistant", "content": "Done."}
+    assert (tmp_path / "a.py").read_text() == "x = 2"
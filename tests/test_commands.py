@@ -0,0 +1,120 @@
+import _thread
+import copy
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from craft_code.commands import check_arguments, run_command
+from craft_code.config.loader import DEFAULT_CONFIG
+from craft_code.session import Session
+from craft_code.tools import execute_tool
+from craft_code.toolselect import request_tools
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs process groups and /proc")
+
+
+def test_limits_are_applied(tmp_path):
+    script = "import resource; print(resource.getrlimit(resource.RLIMIT_CPU)[0], resource.getrlimit(resource.RLIMIT_AS)[0])"
+    result = run_command([sys.executable, "-c", script], str(tmp_path), cpu_seconds=7, max_memory_mb=512)
+    assert result["exit_code"] == 0
+    assert result["output"] == f"7 {512 * 1024 * 1024}"
+
+
+def test_missing_command_with_limits(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        run_command(["no-such-command-xyz"], str(tmp_path), cpu_seconds=5)
+
+
+def test_interrupt_kills_the_process_group(tmp_path):
+    # The child starts a grandchild in the same group and reports both pids
+    script = (
+        "import os, subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(37)'])\n"
+        "print(os.getpid(), child.pid, flush=True)\n"
+        "time.sleep(37)\n"
+    )
+    pids = []
+
+    def on_output(line):
+        pids.extend(int(pid) for pid in line.split())
+        threading.Timer(0.1, _thread.interrupt_main).start()
+
+    with pytest.raises(KeyboardInterrupt):
+        run_command([sys.executable, "-c", script], str(tmp_path), timeout=30, on_output=on_output)
+
+    assert len(pids) == 2
+    with pytest.raises(ProcessLookupError):
+        os.kill(pids[0], 0)
+    # The grandchild is reparented, so it may linger as a zombie until reaped
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline and _state(pids[1]) not in (None, "Z"):
+        time.sleep(0.05)
+    assert _state(pids[1]) in (None, "Z")
+
+
+def _state(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0]
+    except FileNotFoundError:
+        return None
+
+
+@pytest.mark.parametrize("args", [
+    ["git", "diff", "--no-index", "a", "b"],
+    ["git", "diff", "--output", "x.patch"],
+    ["git", "diff", "--output=x.patch"],
+    ["pytest", "--basetemp=tmp"],
+    ["pytest", "--junitxml", "report.xml"],
+    ["git", "-C", "src", "status"],
+    ["git", "-Csrc", "status"],
+    ["make", "test", "-C/tmp"],
+    ["git", "--git-dir=.git", "status"],
+    ["git", "--work-tree", ".", "status"],
+])
+def test_denied_flags(args, tmp_path):
+    assert check_arguments(args, str(tmp_path)).startswith("flag not allowed")
+
+
+@pytest.mark.parametrize("args", [
+    ["pytest", "/etc/passwd"],
+    ["pytest", "../other"],
+    ["pytest", "tests/../../other"],
+    ["ruff", "check", "--config=/tmp/ruff.toml"],
+    ["pytest", "-o", "cache_dir=/tmp/cache"],
+    ["pytest", "-p/tmp/plugin"],
+    ["ruff", "check", "-o../out.txt"],
+])
+def test_paths_outside_the_workspace(args, tmp_path):
+    assert check_arguments(args, str(tmp_path)).startswith("argument outside the workspace")
+
+
+def test_symlink_out_of_the_workspace(tmp_path):
+    workspace = tmp_path / "ws"
+    workspace.mkdir()
+    (workspace / "out").symlink_to(tmp_path)
+    assert check_arguments(["pytest", "out"], str(workspace)) is not None
+
+
+@pytest.mark.parametrize("args", [
+    ["pytest", "-x", "-q", "tests/test_api.py::test_get"],
+    ["pytest", "-k", "not slow", "-vv"],
+    ["pytest", "-o", "cache_dir=.cache"],
+    ["ruff", "check", "--fix", "src"],
+    ["git", "diff", "--stat", "HEAD~1"],
+    ["git", "log", "-n5", "--oneline"],
+])
+def test_workspace_arguments_are_allowed(args, tmp_path):
+    assert check_arguments(args, str(tmp_path)) is None
+
+
+def test_run_command_is_disabled_by_default(tmp_path):
+    session = Session(str(tmp_path), config=copy.deepcopy(DEFAULT_CONFIG))
+    assert session.settings("commands")["enabled"] is False
+    assert "run_command" not in request_tools("fix the failing tests and run pytest", session)
+    assert execute_tool("run_command", {"command": "pytest"}, session) == {
+        "error": "run_command is disabled in the configuration."
+    }
@@ -0,0 +1,49 @@
+import _thread
+import copy
+import threading
+import time
+from types import SimpleNamespace as NS
+
+from craft_code.config.loader import DEFAULT_CONFIG
+from craft_code.core import run_agent
+from craft_code.session import Session
+from craft_code.streaming import AbortableClient
+
+
+class SlowStream:
+    """A stream that yields a content chunk every 50 ms until closed."""
+
+    def __init__(self):
+        self.read = 0
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        while not self.closed.is_set():
+            time.sleep(0.05)
+            self.read += 1
+            yield NS(model="m", usage=None, choices=[NS(delta=NS(content="x", tool_calls=None), finish_reason=None)])
+
+    def close(self):
+        self.closed.set()
+
+
+def test_interrupt_closes_the_stream(tmp_path):
+    stream = SlowStream()
+    provider = NS(chat=NS(completions=NS(create=lambda **kwargs: stream)))
+    session = Session(str(tmp_path), config=copy.deepcopy(DEFAULT_CONFIG))
+    messages = [{"role": "user", "content": "hello"}]
+    notices = []
+
+    timer = threading.Timer(0.3, _thread.interrupt_main)
+    timer.start()
+    try:
+        run_agent(messages, AbortableClient(provider), session=session, callback=notices.append)
+    finally:
+        timer.cancel()
+
+    assert session.turn_stats["stop_reason"] == "cancelled"
+    assert messages == [{"role": "user", "content": "hello"}]
+    assert stream.closed.wait(1)
+    read = stream.read
+    time.sleep(0.3)
+    assert stream.read == read
@@ -0,0 +1,72 @@
+import copy
+from types import SimpleNamespace as NS
+
+import pytest
+
+pytest.importorskip("openai")
+
+from openai.types.chat import ChatCompletion  # noqa: E402
+
+from craft_code import tools  # noqa: E402,F401 (registers the tools)
+from craft_code.config.loader import DEFAULT_CONFIG  # noqa: E402
+from craft_code.delegate import run_subtasks  # noqa: E402
+from craft_code.session import Session  # noqa: E402
+
+
+def _response(content=None, tool_calls=None, finish_reason="stop"):
+    message = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "m",
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+    })
+
+
+def _client(*responses):
+    """Fake client answering each sub-agent with ``responses`` in turn."""
+    script = list(responses)
+
+    def create(**request):
+        steps = sum(1 for m in request["messages"] if m.get("role") == "assistant")
+        return script[min(steps, len(script) - 1)]
+
+    return NS(chat=NS(completions=NS(create=create)))
+
+
+LIST_CALL = _response(tool_calls=[{
+    "id": "call_1", "type": "function",
+    "function": {"name": "list_directory", "arguments": '{"path": "."}'},
+}], finish_reason="tool_calls")
+
+
+@pytest.fixture
+def session(tmp_path):
+    (tmp_path / "a.py").write_text("x = 1\n")
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    session = Session(str(tmp_path), config=config)
+    yield session
+    session.close()
+
+
+def test_answer_is_the_final_assistant_message(session):
+    session.client = _client(LIST_CALL, _response("a.py defines x."))
+    [record] = run_subtasks(session, ["What is in the workspace?"])
+    assert record["status"] == "ok"
+    assert record["result"] == "a.py defines x."
+
+
+def test_empty_answer_is_not_ok(session):
+    session.client = _client(LIST_CALL, _response(""))
+    [record] = run_subtasks(session, ["What is in the workspace?"])
+    assert record["status"] == "empty"
+    assert "result" not in record
+    assert "a.py" not in record["error"]
+
+
+def test_step_budget_is_reported(session):
+    session.client = _client(LIST_CALL)
+    session.config["delegate"] = {**session.settings("delegate"), "max_steps": 2}
+    [record] = run_subtasks(session, ["What is in the workspace?"])
+    assert record["status"] == "stopped"
+    assert "maximum of 2 steps" in record["error"]
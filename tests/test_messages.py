@@ -0,0 +1,45 @@
+import hashlib
+import json
+
+from craft_code.messages import MessageStore
+
+
+def _digest(messages):
+    digest = b""
+    for message in messages:
+        encoded = json.dumps(message, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        digest = hashlib.sha256(digest + encoded).digest()
+    return digest.hex()
+
+
+def test_nothing_is_hashed_until_the_digest_is_read():
+    store = MessageStore()
+    messages = [{"role": "user", "content": "hi"}]
+    sent = store.sync(messages)
+    assert sent == messages
+    assert all(record.digest is None for record in store._records)
+    assert sent.digest == _digest(messages)
+
+
+def test_only_new_messages_are_hashed():
+    store = MessageStore()
+    messages = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    store.sync(messages).digest
+    first = [record.digest for record in store._records]
+    messages.append({"role": "user", "content": "more"})
+    sent = store.sync(messages)
+    assert [record.digest for record in store._records[:2]] == first
+    assert store._records[2].digest is None
+    assert sent.digest == _digest(messages)
+
+
+def test_replaced_message_is_hashed_again():
+    store = MessageStore()
+    messages = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    store.sync(messages).digest
+    messages[1] = {"role": "assistant", "content": "changed"}
+    assert store.sync(messages).digest == _digest(messages)
+
+
+def test_empty_history():
+    assert MessageStore().sync([]).digest == hashlib.sha256(b"").hexdigest()
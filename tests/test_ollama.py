@@ -0,0 +1,195 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("openai")
+
+from craft_code.ollama import OllamaClient, OllamaError  # noqa: E402
+
+TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": "read_file",
+        "description": "Read a file.",
+        "parameters": {"type": "object", "properties": {"path": {"type": "string"}}, "required": ["path"]},
+    },
+}]
+
+
+def _events(payload):
+    """NDJSON events of a stand-in /api/chat answer."""
+    if payload.get("tools") and not any(m["role"] == "tool" for m in payload["messages"]):
+        return [
+            {"message": {"role": "assistant", "content": "Let me look. "}, "done": False},
+            {"message": {"role": "assistant", "content": "", "tool_calls": [
+                {"function": {"name": "read_file", "arguments": {"path": "a.py"}}},
+            ]}, "done": False},
+            {"message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop",
+             "prompt_eval_count": 12, "eval_count": 7},
+        ]
+    return [
+        {"message": {"role": "assistant", "content": "Hel"}, "done": False},
+        {"message": {"role": "assistant", "content": "lo"}, "done": False},
+        {"message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop",
+         "prompt_eval_count": 20, "eval_count": 2},
+    ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body, status=200, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append((self.path, None))
+        if self.path == "/api/tags":
+            self._reply(json.dumps({"models": [{"name": "qwen3:4b"}, {"name": "nomic-embed-text"}]}).encode())
+        else:
+            self._reply(b'{"error": "not found"}', status=404)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.path, payload))
+        if self.path == "/api/embed":
+            embeddings = [[float(len(text)), 1.0] for text in payload["input"]]
+            self._reply(json.dumps({"embeddings": embeddings}).encode())
+        elif self.path == "/api/chat" and payload["model"] == "missing":
+            self._reply(b'{"error": "model \'missing\' not found"}', status=404)
+        elif self.path == "/api/chat":
+            body = b"".join((json.dumps(event) + "\n").encode() for event in _events(payload))
+            self._reply(body, content_type="application/x-ndjson")
+        else:
+            self._reply(b'{"error": "not found"}', status=404)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client(server):
+    host, port = server.server_address
+    return OllamaClient(f"http://{host}:{port}/v1", keep_alive="1h", num_ctx=8192, num_thread=4, timeout=5)
+
+
+def test_create_with_tool_calls(client, server):
+    response = client.chat.completions.create(
+        model="qwen3:4b",
+        messages=[{"role": "user", "content": "What is in a.py?"}],
+        tools=TOOLS,
+        temperature=0.2,
+        max_tokens=100,
+    )
+    message = response.choices[0].message
+    assert message.content == "Let me look. "
+    assert response.choices[0].finish_reason == "tool_calls"
+    assert [(call.function.name, json.loads(call.function.arguments)) for call in message.tool_calls] == [
+        ("read_file", {"path": "a.py"}),
+    ]
+    assert message.tool_calls[0].id.startswith("call_")
+    assert (response.usage.prompt_tokens, response.usage.completion_tokens) == (12, 7)
+
+    path, payload = server.requests[-1]
+    assert path == "/api/chat"
+    assert payload["keep_alive"] == "1h"
+    assert payload["stream"] is True
+    assert payload["tools"] == TOOLS
+    assert payload["options"] == {"num_ctx": 8192, "num_thread": 4, "temperature": 0.2, "num_predict": 100}
+
+
+def test_create_converts_tool_history(client, server):
+    history = [
+        {"role": "user", "content": "What is in a.py?"},
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": "call_1", "type": "function", "function": {"name": "read_file", "arguments": '{"path": "a.py"}'}},
+        ]},
+        {"role": "tool", "tool_call_id": "call_1", "content": '{"content": "x = 1"}'},
+    ]
+    response = client.chat.completions.create(model="qwen3:4b", messages=history, tools=TOOLS)
+    assert response.choices[0].message.content == "Hello"
+    assert response.choices[0].finish_reason == "stop"
+
+    messages = server.requests[-1][1]["messages"]
+    assert messages[1] == {
+        "role": "assistant",
+        "content": "",
+        "tool_calls": [{"function": {"name": "read_file", "arguments": {"path": "a.py"}}}],
+    }
+    assert messages[2] == {"role": "tool", "content": '{"content": "x = 1"}', "tool_name": "read_file"}
+
+
+def test_history_is_encoded_once(client, server, monkeypatch):
+    from craft_code import ollama
+
+    converted = []
+    convert = ollama._to_ollama_message
+    monkeypatch.setattr(ollama, "_to_ollama_message", lambda m, names: converted.append(m) or convert(m, names))
+    history = [{"role": "user", "content": "What is in a.py?"}]
+    client.chat.completions.create(model="qwen3:4b", messages=history)
+    history += [{"role": "assistant", "content": "Hello"}, {"role": "user", "content": "And b.py?"}]
+    client.chat.completions.create(model="qwen3:4b", messages=history)
+
+    assert [m["content"] for m in converted] == ["What is in a.py?", "Hello", "And b.py?"]
+    assert [m["content"] for m in server.requests[-1][1]["messages"]] == ["What is in a.py?", "Hello", "And b.py?"]
+    assert server.requests[-1][1]["keep_alive"] == "1h"
+
+
+def test_stream(client, server):
+    chunks = list(client.chat.completions.create(
+        model="qwen3:4b",
+        messages=[{"role": "user", "content": "What is in a.py?"}],
+        tools=TOOLS,
+        stream=True,
+    ))
+    content = "".join(chunk.choices[0].delta.content or "" for chunk in chunks)
+    calls = [call for chunk in chunks for call in chunk.choices[0].delta.tool_calls or []]
+    assert content == "Let me look. "
+    assert [(call.index, call.function.name, json.loads(call.function.arguments)) for call in calls] == [
+        (0, "read_file", {"path": "a.py"}),
+    ]
+    assert chunks[-1].choices[0].finish_reason == "tool_calls"
+    assert chunks[-1].usage.total_tokens == 19
+    assert server.requests[-1][1]["keep_alive"] == "1h"
+
+
+def test_embeddings(client, server):
+    response = client.embeddings.create(model="nomic-embed-text", input=["ab", "abcd"])
+    assert [item.embedding for item in response.data] == [[2.0, 1.0], [4.0, 1.0]]
+    assert [item.index for item in response.data] == [0, 1]
+    assert server.requests[-1] == (
+        "/api/embed",
+        {"model": "nomic-embed-text", "input": ["ab", "abcd"], "keep_alive": "1h"},
+    )
+
+
+def test_models_list(client):
+    assert [model.id for model in client.models.list().data] == ["qwen3:4b", "nomic-embed-text"]
+
+
+def test_with_options_keeps_runtime_options(client, server):
+    clone = client.with_options(timeout=1, max_retries=0)
+    assert clone.timeout == 1
+    clone.chat.completions.create(model="qwen3:4b", messages=[{"role": "user", "content": "hi"}])
+    payload = server.requests[-1][1]
+    assert payload["keep_alive"] == "1h"
+    assert payload["options"] == {"num_ctx": 8192, "num_thread": 4}
+
+
+def test_error(client):
+    with pytest.raises(OllamaError, match="not found"):
+        client.chat.completions.create(model="missing", messages=[{"role": "user", "content": "hi"}])
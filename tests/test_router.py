@@ -0,0 +1,70 @@
+import threading
+import time
+from types import SimpleNamespace as NS
+
+import pytest
+
+pytest.importorskip("openai")
+
+from craft_code.router import Endpoint, ProviderRouter  # noqa: E402
+from craft_code.streaming import AbortableClient, AbortScope, StreamAbandoned  # noqa: E402
+
+
+class Provider:
+    """Stand-in provider streaming ``chunks`` content chunks, ``delay`` seconds apart."""
+
+    def __init__(self, chunks, delay):
+        self.chunks = chunks
+        self.delay = delay
+        self.calls = 0
+        self.closed = threading.Event()
+        self.chat = NS(completions=NS(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls += 1
+        return self
+
+    def __iter__(self):
+        for _ in range(self.chunks):
+            if self.closed.is_set():
+                return
+            time.sleep(self.delay)
+            yield NS(model="m", usage=None, choices=[NS(delta=NS(content="x", tool_calls=None), finish_reason=None)])
+        yield NS(model="m", usage=None, choices=[NS(delta=NS(content=None, tool_calls=None), finish_reason="stop")])
+
+    def close(self):
+        self.closed.set()
+
+
+def _router(providers, hedge_delay=0.0):
+    endpoints = [Endpoint(f"p{i}", AbortableClient(p), "m") for i, p in enumerate(providers)]
+    return ProviderRouter(endpoints, hedge_delay=hedge_delay, probe_interval=0), endpoints
+
+
+@pytest.mark.parametrize("hedge_delay", [0.0, 0.05])
+def test_abort_is_not_a_provider_failure(hedge_delay):
+    first, second = Provider(1000, 0.02), Provider(1000, 0.02)
+    router, endpoints = _router([first, second], hedge_delay)
+    scope = AbortScope()
+    threading.Timer(0.2, scope.abort).start()
+
+    with scope, pytest.raises(StreamAbandoned):
+        router.chat.completions.create(model="m", messages=[])
+
+    assert first.closed.wait(1) and (second.calls == 0 or second.closed.wait(1))
+    assert second.calls == (1 if hedge_delay else 0)
+    assert [e.healthy for e in endpoints] == [True, True]
+    assert [e.error_rate for e in endpoints] == [0.0, 0.0]
+    router.close()
+
+
+def test_hedged_loser_is_aborted():
+    slow, fast = Provider(1000, 0.02), Provider(3, 0.01)
+    router, endpoints = _router([slow, fast], hedge_delay=0.05)
+
+    response = router.chat.completions.create(model="m", messages=[])
+
+    assert response.choices[0].message.content == "xxx"
+    assert slow.closed.wait(1)
+    assert endpoints[0].error_rate == 0.0
+    router.close()
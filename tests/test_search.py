@@ -0,0 +1,138 @@
+import re
+
+import pytest
+
+from craft_code.search import MAX_LINE_CHARS, search_file
+
+
+@pytest.fixture
+def write(tmp_path):
+    def write(content, name="sample.txt"):
+        path = tmp_path / name
+        path.write_bytes(content.encode("utf-8") if isinstance(content, str) else content)
+        return str(path)
+
+    return write
+
+
+LINES = "".join(f"line {i}\n" for i in range(1, 11))
+
+
+def test_line_numbers(write):
+    path = write("alpha\nbeta\ngamma\nbeta again\n")
+    matches, truncated = search_file(path, ["beta"])
+    assert matches == [{"line": 2, "text": "beta"}, {"line": 4, "text": "beta again"}]
+    assert truncated is False
+
+
+def test_one_result_per_line(write):
+    path = write("foo foo foo\nbar\nfoo\n")
+    matches, _ = search_file(path, ["foo"])
+    assert [m["line"] for m in matches] == [1, 3]
+
+
+def test_first_and_last_line_without_trailing_newline(write):
+    path = write("match first\nmiddle\nmatch last")
+    matches, _ = search_file(path, ["match"])
+    assert matches == [{"line": 1, "text": "match first"}, {"line": 3, "text": "match last"}]
+
+
+def test_trailing_newline_adds_no_line(write):
+    path = write("a\nb\n")
+    matches, _ = search_file(path, ["^"])
+    assert [m["line"] for m in matches] == [1, 2]
+
+
+def test_empty_file(write):
+    assert search_file(write(""), ["x"]) == ([], False)
+
+
+def test_several_patterns_and_case(write):
+    path = write("Error here\nwarning there\nnothing\n")
+    matches, _ = search_file(path, ["error", "WARN"])
+    assert [m["line"] for m in matches] == [1, 2]
+    matches, _ = search_file(path, ["error", "WARN"], case_sensitive=True)
+    assert matches == []
+
+
+def test_inline_flags_in_any_pattern(write):
+    path = write("TODO one\nfixme two\n")
+    matches, _ = search_file(path, ["nothing", "(?i)todo"], case_sensitive=True)
+    assert [m["line"] for m in matches] == [1]
+
+
+def test_backreferences_are_per_pattern(write):
+    path = write("foo foo\nbar bar\nfoo bar\n")
+    matches, _ = search_file(path, ["(foo) \\1", "(bar) \\1"], case_sensitive=True)
+    assert [m["line"] for m in matches] == [1, 2]
+
+
+def test_earliest_pattern_wins_across_lines(write):
+    path = write("b\na\nb\na\n")
+    matches, _ = search_file(path, ["a", "b"], case_sensitive=True)
+    assert [m["line"] for m in matches] == [1, 2, 3, 4]
+
+
+def test_invalid_pattern(write):
+    path = write("x\n")
+    with pytest.raises(re.error):
+        search_file(path, ["ok", "(unclosed"])
+
+
+def test_context(write):
+    path = write(LINES)
+    matches, _ = search_file(path, ["line 5$"], before=2, after=3)
+    assert matches == [{
+        "line": 5,
+        "text": "line 5",
+        "before": ["line 3", "line 4"],
+        "after": ["line 6", "line 7", "line 8"],
+    }]
+
+
+def test_context_clipped_at_file_edges(write):
+    path = write(LINES)
+    first, _ = search_file(path, ["line 1$"], before=3, after=1)
+    assert first[0]["before"] == []
+    assert first[0]["after"] == ["line 2"]
+    last, _ = search_file(path, ["line 10"], before=1, after=3)
+    assert last[0]["before"] == ["line 9"]
+    assert last[0]["after"] == []
+
+
+def test_context_without_trailing_newline(write):
+    path = write("a\nb\nc")
+    matches, _ = search_file(path, ["^b"], before=5, after=5)
+    assert matches[0]["before"] == ["a"]
+    assert matches[0]["after"] == ["c"]
+
+
+def test_context_keeps_empty_lines(write):
+    path = write("a\n\nb\n\nc\n")
+    matches, _ = search_file(path, ["^b"], before=1, after=1)
+    assert matches[0]["before"] == [""]
+    assert matches[0]["after"] == [""]
+
+
+def test_max_matches(write):
+    path = write(LINES)
+    matches, truncated = search_file(path, ["line"], max_matches=3)
+    assert [m["line"] for m in matches] == [1, 2, 3]
+    assert truncated is True
+    matches, truncated = search_file(path, ["line"], max_matches=10)
+    assert len(matches) == 10
+    assert truncated is False
+
+
+def test_crlf_and_long_lines(write):
+    path = write("short\r\n" + "x" * (MAX_LINE_CHARS * 2) + " needle\r\nend\r\n")
+    matches, _ = search_file(path, ["needle"], before=1)
+    assert matches[0]["line"] == 2
+    assert len(matches[0]["text"]) == MAX_LINE_CHARS
+    assert matches[0]["before"] == ["short"]
+
+
+def test_invalid_utf8_is_ignored(write):
+    path = write(b"caf\xe9 ok\nplain\n")
+    matches, _ = search_file(path, ["ok"])
+    assert matches == [{"line": 1, "text": "caf ok"}]
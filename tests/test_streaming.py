@@ -0,0 +1,40 @@
+import copy
+from types import SimpleNamespace as NS
+
+import pytest
+
+pytest.importorskip("openai")
+
+from craft_code import tools  # noqa: E402,F401 (registers the tools)
+from craft_code.config.loader import DEFAULT_CONFIG  # noqa: E402
+from craft_code.registry import get_tool  # noqa: E402
+from craft_code.session import Session  # noqa: E402
+from craft_code.streaming import Speculator  # noqa: E402
+
+
+def _call_chunk(index, name, arguments):
+    call = NS(index=index, id=f"call_{index}", function=NS(name=name, arguments=arguments))
+    return NS(model="m", usage=None, choices=[NS(delta=NS(content=None, tool_calls=[call]), finish_reason=None)])
+
+
+def _client(chunks):
+    return NS(chat=NS(completions=NS(create=lambda **kwargs: iter(chunks))))
+
+
+def test_next_page_is_not_idempotent():
+    assert get_tool("next_page").idempotent is False
+    assert get_tool("read_file").idempotent is True
+
+
+def test_non_idempotent_calls_are_not_speculated(tmp_path):
+    session = Session(str(tmp_path), config=copy.deepcopy(DEFAULT_CONFIG))
+    speculator = Speculator(session)
+    response = speculator.run(_client([
+        _call_chunk(0, "list_directory", '{"path": "."}'),
+        _call_chunk(1, "next_page", '{"cursor": "abc"}'),
+    ]), {"model": "m", "messages": []})
+    started = set(speculator.started)
+    speculator.close()
+
+    assert [call.function.name for call in response.choices[0].message.tool_calls] == ["list_directory", "next_page"]
+    assert started == {"call_0"}
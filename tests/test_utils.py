@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from craft_code.repomap import RepoMap
+from craft_code.utils import iter_workspace_files
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "secret.py").write_text("def leaked_secret_fn():\n    pass\n")
+    ws = tmp_path / "ws"
+    (ws / "pkg").mkdir(parents=True)
+    (ws / "pkg" / "app.py").write_text("def visible_fn():\n    pass\n")
+    (ws / "link.py").symlink_to(outside / "secret.py")
+    (ws / "linked_dir").symlink_to(outside)
+    (ws / "alias.py").symlink_to(ws / "pkg" / "app.py")
+    return ws
+
+
+def test_symlinks_out_of_the_workspace_are_skipped(workspace):
+    files = [os.path.relpath(path, workspace) for path in iter_workspace_files(str(workspace))]
+    assert files == ["alias.py", os.path.join("pkg", "app.py")]
+
+
+def test_repo_map_does_not_leak_outside_files(workspace, tmp_path):
+    rendered = RepoMap(str(workspace), tmp_path).render()
+    assert "visible_fn" in rendered
+    assert "leaked_secret_fn" not in rendered